@@ -0,0 +1,416 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Scene distribution server
+#
+#  Serves the scene packages on a ROUTER socket from its own thread. Every request is answered
+#  as soon as it arrives, so many clients can download the scene at the same time and clients
+#  using a DEALER socket can pipeline their requests. The server never touches bpy, it only
+#  reads the immutable package snapshot handed to it.
+#
+#  A plain request like 'objects' is answered with the whole package in a single frame.
+#  Requests can carry parameters in query string form, e.g. 'objects?offset=0&size=65536'.
+#  Those are answered with two frames: a query string describing the reply and the payload.
+#
+#  Large packages can be streamed in chunks by requesting 'offset' and 'size'. The reply
+#  metadata holds the 'total' size of the package, the 'offset' and 'size' of the chunk and the
+#  chunk size 'limit' of the server.
+#  Chunks are zero-copy slices of the package and never larger than the server's chunk limit.
+#  Flow control is credit based: a client keeps a fixed number of chunk requests in flight and
+#  only asks for the next chunk after one has arrived, so a slow client never has more than its
+#  credit queued on the server (see requestChunked).
+#  The ROUTER socket is set to ROUTER_MANDATORY, so replies to a client whose send queue is full
+#  are not dropped. They are kept back in order and sent once the client has caught up.
+#
+#  Clients that can decode compressed packages list the encodings they accept, e.g.
+#  'objects?encoding=zlib'. The reply metadata names the 'encoding' actually used, which is
+#  'identity' if no worthwhile compressed variant exists. Chunked requests of an encoded
+#  package are slices of the encoded data.
+#
+#  Every package carries a 'version', a hash of its content computed when it is published and
+#  reported in the metadata of every parameterised reply. A reconnecting client sends the
+#  version it already has, e.g. 'objects?v=3f2a...', and gets 'status=304' with an empty
+#  payload if the package did not change, otherwise 'status=200' with the new data.
+#  The request 'versions' returns the versions of all packages as a query string.
+#
+#  Some packages exist in variants, selected by request parameters listed in variantParams.
+#  'objects?lod=2' is served from the package published as 'objects.lod2'. Missing variants
+#  fall back to the closest published one, for levels of detail the next lower level and finally
+#  the package itself. The reply metadata names the 'variant' actually served.
+#  'objects?indices=16' and 'nodes?indices=16' serve the geometry with 16 bit indices, every geo
+#  entry carries its index width and large meshes are split into parts placed by extra nodes.
+#  Both packages have to be requested with the same parameter.
+#  'objects?quant=1' serves quantized vertex attributes (see quantization.py) and combines with
+#  the other geo variants.
+#  'textures?class=tablet' serves the textures downscaled and re-encoded for a client class.
+#
+#  Textures can also be fetched one by one as 'texture/<hash>', again with an optional client
+#  class. 'texturehashes' lists the hashes in the order of the textures package, one per line.
+#  The hash identifies the content, so single textures are not listed in 'versions'.
+#
+#  'gltf' serves the whole scene as binary glTF (.glb), see gltfExport.py.
+
+import collections
+import itertools
+import threading
+import zlib
+from urllib.parse import parse_qsl, urlencode
+
+import zmq
+
+from .packageEncoding import packageVersion
+
+## Names of the packages a client can request
+packageNames = ('header', 'nodes', 'objects', 'characters', 'textures', 'materials', 'curve', 'texturehashes', 'gltf')
+
+## Request parameters selecting a variant of a package, in the order they appear in its name
+variantParams = ('lod', 'indices', 'quant', 'class')
+
+## Names the requested variant of a package may be published under
+#
+# @param name   Package name, e.g. 'objects'
+# @param params Request parameters
+# @returns      Generator of names from the requested variant, e.g. 'objects.lod2', down to the
+#               package name itself
+def variantCandidates(name, params):
+    options = []
+    for param in variantParams:
+        value = params.get(param, '')
+        if value in ('', '0'):
+            continue
+        values = [str(level) for level in range(int(value), 0, -1)] if param == 'lod' and value.isdigit() else [value]
+        options.append([f'.{param}{value}' for value in values] + [''])
+    for suffixes in itertools.product(*options):
+        yield name + ''.join(suffixes)
+
+## Split a request into package name and parameters
+#
+# @param request The request string, e.g. 'objects?offset=0&size=65536'
+# @returns       Tuple (package name, dictionary of parameters)
+def parseRequest(request):
+    name, _, query = request.partition('?')
+    return name, dict(parse_qsl(query, keep_blank_values=True))
+
+class DistributionServer(threading.Thread):
+    ## Constructor
+    #
+    # @param context  ZMQ context to create the socket with
+    # @param address  Address to bind the ROUTER socket to
+    # @param packages Dictionary of package name to package data
+    # @param encoded  Dictionary of package name to a dictionary of encoding to encoded data
+    # @param maxChunkSize Largest chunk in bytes sent for a chunked request
+    # @param sendQueueSize Number of messages queued per client in the socket, further replies are kept back by the server
+    # @param workers  Number of threads answering requests, 1 answers them on the server thread
+    def __init__(self, context, address, packages, encoded=None, maxChunkSize=512 * 1024, sendQueueSize=64, workers=1):
+        super().__init__(name='VPET Distribution Server', daemon=True)
+        self.context = context
+        self.address = address
+        self.maxChunkSize = maxChunkSize
+        self.sendQueueSize = sendQueueSize
+        self.workers = workers
+        self.requestCount = 0
+        # replies kept back while the send queue of a client is full, by client identity
+        self._pending = {}
+        self._state = ({}, {})
+        self._stopEvent = threading.Event()
+        self.publish(packages, encoded)
+
+    ## Replace served packages
+    #
+    #  The data is wrapped into read-only views, the caller must not modify it afterwards but
+    #  may replace it by publishing again. Encoded variants of a package are dropped when the
+    #  package is published again without them.
+    #
+    # @param packages Dictionary of package name to package data
+    # @param encoded  Dictionary of package name to a dictionary of encoding to encoded data
+    # @param knownVersions Dictionary of package name to its already computed version
+    # @param replace  Drop all packages that are not published again
+    def publish(self, packages, encoded=None, knownVersions=None, replace=False):
+        encoded = encoded or {}
+        knownVersions = knownVersions or {}
+        packagesBefore, versionsBefore = self._state
+        updated = {} if replace else dict(packagesBefore)
+        versions = {} if replace else dict(versionsBefore)
+        for name, data in packages.items():
+            versions[name] = knownVersions.get(name) or packageVersion(data)
+            variants = {'identity': memoryview(data).toreadonly()}
+            for encoding, encodedData in encoded.get(name, {}).items():
+                variants[encoding] = memoryview(encodedData).toreadonly()
+            updated[name] = variants
+        # swapping the reference is atomic, the server thread sees either the old or the new state
+        self._state = (updated, versions)
+
+    ## Versions of the served packages
+    def versions(self):
+        return dict(self._state[1])
+
+    def stop(self):
+        self._stopEvent.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        socket = self.context.socket(zmq.ROUTER)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.setsockopt(zmq.SNDHWM, self.sendQueueSize)
+        socket.setsockopt(zmq.ROUTER_MANDATORY, 1)
+        try:
+            socket.bind(self.address)
+        except zmq.ZMQError as e:
+            print(f"Could not start distribution server on {self.address}: {e}")
+            socket.close()
+            return
+
+        if self.workers > 1:
+            self.runWorkers(socket)
+            socket.close()
+            return
+
+        while not self._stopEvent.is_set():
+            self.flush(socket)
+            if not socket.poll(10 if self._pending else 100):
+                continue
+            # answer everything that is queued before waiting again
+            while True:
+                try:
+                    frames = socket.recv_multipart(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+                self.route(socket, self.handle(frames))
+        socket.close()
+
+    ## Send a reply to a client without waiting for it
+    #
+    #  If the send queue of the client is full, the reply is kept back behind its earlier replies.
+    #  Replies to clients that disconnected are dropped.
+    #
+    # @param socket The ROUTER socket
+    # @param frames Reply frames, starting with the client identity
+    def route(self, socket, frames):
+        identity = bytes(frames[0])
+        pending = self._pending.get(identity)
+        if pending is not None:
+            pending.append(frames)
+            return
+        try:
+            socket.send_multipart(frames, zmq.NOBLOCK, copy=False)
+        except zmq.Again:
+            self._pending[identity] = collections.deque([frames])
+        except zmq.ZMQError:
+            pass
+
+    ## Send the replies kept back by route as far as the clients take them
+    def flush(self, socket):
+        for identity, pending in list(self._pending.items()):
+            while pending:
+                try:
+                    socket.send_multipart(pending[0], zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                except zmq.ZMQError:
+                    pending.clear()
+                    break
+                pending.popleft()
+            if not pending:
+                del self._pending[identity]
+
+    ## Hand the requests to a pool of worker threads
+    #
+    #  Every worker has its own inproc PAIR socket. Requests are passed on with their envelope to
+    #  the worker chosen by the client identity, so all requests of one client are answered by the
+    #  same thread and its pipelined replies keep their order. The replies come back the same way
+    #  and are routed to the clients. Frames are passed on without copying.
+    def runWorkers(self, socket):
+        backends = []
+        threads = []
+        for i in range(self.workers):
+            backendAddress = f'inproc://vpet-distribution-{id(self)}-{i}'
+            backend = self.context.socket(zmq.PAIR)
+            backend.setsockopt(zmq.LINGER, 0)
+            backend.bind(backendAddress)
+            backends.append(backend)
+            threads.append(threading.Thread(target=self.work, args=(backendAddress,), name=f'VPET Distribution Worker {i}', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        for backend in backends:
+            poller.register(backend, zmq.POLLIN)
+        while not self._stopEvent.is_set():
+            self.flush(socket)
+            events = dict(poller.poll(10 if self._pending else 100))
+            if socket in events:
+                while True:
+                    try:
+                        frames = socket.recv_multipart(zmq.NOBLOCK, copy=False)
+                    except zmq.Again:
+                        break
+                    backends[zlib.crc32(frames[0].bytes) % len(backends)].send_multipart(frames, copy=False)
+            for backend in backends:
+                if backend not in events:
+                    continue
+                while True:
+                    try:
+                        frames = backend.recv_multipart(zmq.NOBLOCK, copy=False)
+                    except zmq.Again:
+                        break
+                    self.route(socket, frames)
+        for thread in threads:
+            thread.join()
+        for backend in backends:
+            backend.close()
+
+    ## Answer requests handed out by runWorkers until the server stops
+    def work(self, backendAddress):
+        socket = self.context.socket(zmq.PAIR)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.connect(backendAddress)
+        while not self._stopEvent.is_set():
+            if socket.poll(100):
+                socket.send_multipart(self.handle(socket.recv_multipart()), copy=False)
+        socket.close()
+
+    ## Answer a single request
+    #
+    #  The envelope (client identity and, for REQ clients, the empty delimiter) is put in front
+    #  of the reply so that ROUTER routes it to the requesting client.
+    #
+    # @param frames The request frames with their envelope
+    # @returns      The reply frames with the envelope
+    def handle(self, frames):
+        envelope = frames[:-1]
+        request = bytes(frames[-1]).decode('ascii', 'replace')
+        self.requestCount += 1
+        return envelope + self.reply(request)
+
+    ## Build the reply frames for a request
+    #
+    # @param request The request string, e.g. 'nodes' or 'objects?offset=0&size=65536'
+    # @returns       List of frames, a single empty frame for unknown requests
+    def reply(self, request):
+        name, params = parseRequest(request)
+        packages, versions = self._state
+        if name == 'versions':
+            return [urlencode({name: version for name, version in versions.items() if '/' not in name}).encode('ascii')]
+
+        variants = packages.get(name)
+        if variants is None:
+            return [b'']
+        if not params:
+            print(f"{name} request! Sending...")
+            return [variants['identity']]
+
+        meta = {'status': 200}
+        variant = name
+        if any(param in params for param in variantParams):
+            variant = next(candidate for candidate in variantCandidates(name, params) if candidate in packages)
+            variants = packages[variant]
+            meta['variant'] = variant[len(name) + 1:]
+
+        version = versions[variant]
+        meta['version'] = version
+        if params.get('v') == version:
+            meta['status'] = 304
+            return [urlencode(meta).encode('ascii'), b'']
+
+        data = variants['identity']
+        if 'encoding' in params:
+            meta['encoding'] = 'identity'
+            for encoding in params['encoding'].split(','):
+                if encoding in variants:
+                    meta['encoding'] = encoding
+                    data = variants[encoding]
+                    break
+            meta['decodedSize'] = len(variants['identity'])
+
+        payload = data
+        if 'offset' in params or 'size' in params:
+            payload, chunkMeta = self.chunk(data, params)
+            meta.update(chunkMeta)
+        return [urlencode(meta).encode('ascii'), payload]
+
+    ## Cut the requested chunk out of a package
+    #
+    # @returns Tuple (zero-copy slice of the package, reply metadata)
+    def chunk(self, data, params):
+        total = len(data)
+        try:
+            offset = min(max(int(params.get('offset', 0)), 0), total)
+            size = int(params.get('size', self.maxChunkSize))
+        except ValueError:
+            offset, size = total, 0
+        size = min(max(size, 0), self.maxChunkSize, total - offset)
+        return data[offset:offset + size], {'total': total, 'offset': offset, 'size': size, 'limit': self.maxChunkSize}
+
+## Download a package in chunks with credit based flow control
+#
+#  Reference implementation of the client side, used by tools and for testing. Replies are put
+#  back together by the offset in their metadata, so they may arrive in any order.
+#
+# @param socket    Connected DEALER socket
+# @param name      Name of the package, optionally with further parameters
+# @param chunkSize Requested size of every chunk
+# @param credit    Number of chunk requests kept in flight
+# @returns         Generator yielding the chunks in order
+def requestChunked(socket, name, chunkSize=256 * 1024, credit=8):
+    separator = '&' if '?' in name else '?'
+
+    # the first reply tells the total size and the server's chunk limit
+    socket.send_string(f'{name}{separator}offset=0&size={chunkSize}')
+    meta, payload = socket.recv_multipart(copy=False)
+    meta = dict(parse_qsl(bytes(meta).decode('ascii')))
+    total = int(meta['total'])
+    chunkSize = min(chunkSize, int(meta['limit']))
+    offset = int(meta['size'])
+    if offset > 0:
+        yield payload
+
+    # chunks that arrived ahead of the next one to yield, by offset
+    pending = {}
+    requested = offset
+    inFlight = 0
+    while offset < total:
+        while inFlight < credit and requested < total:
+            socket.send_string(f'{name}{separator}offset={requested}&size={chunkSize}')
+            requested += chunkSize
+            inFlight += 1
+        meta, payload = socket.recv_multipart(copy=False)
+        inFlight -= 1
+        pending[int(dict(parse_qsl(bytes(meta).decode('ascii')))['offset'])] = payload
+        while offset in pending:
+            payload = pending.pop(offset)
+            offset += len(payload)
+            yield payload
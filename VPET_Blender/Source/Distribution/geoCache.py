@@ -0,0 +1,222 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Cache of serialized geo blocks
+#
+#  Entries are keyed by a hash over the extracted mesh arrays, so an unchanged mesh is found
+#  again even if it got renamed and an edited one is never confused with its old version.
+#  Recently used blocks are kept in memory, all blocks are also written to a cache directory
+#  so that they survive a restart of the distribution and of Blender. The files in the cache
+#  directory are limited to a number of bytes as well, the least recently used ones are deleted
+#  first. Their use is tracked by the modification time of the files.
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+## Increase whenever the layout of the cached blocks or the processing changes
+FORMAT_VERSION = 1
+
+## Compute the cache key for a mesh
+#
+# @param raw Dictionary of arrays returned by sceneDistribution.extractMeshArrays
+# @returns   Hex digest identifying the mesh data
+def meshKey(raw):
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(FORMAT_VERSION.to_bytes(4, 'little'))
+    for name in sorted(raw):
+        value = raw[name]
+        digest.update(name.encode())
+        if isinstance(value, np.ndarray):
+            digest.update(str(value.shape).encode())
+            digest.update(np.ascontiguousarray(value).data)
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+## Compute the cache key of data derived from a mesh, e.g. a level of detail
+#
+# @param key   Cache key of the mesh
+# @param parts Values describing the derived data
+# @returns     Hex digest identifying the derived data
+def derivedKey(key, *parts):
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(key.encode())
+    digest.update(repr(parts).encode())
+    return digest.hexdigest()
+
+class GeoCache:
+    ## Constructor
+    #
+    # @param maxMemory Maximum number of bytes kept in memory
+    # @param directory Directory for the on disk cache, None disables it
+    # @param suffix    File name extension of the cached entries
+    # @param maxDisk   Maximum number of bytes kept in the cache directory, 0 for no limit
+    def __init__(self, maxMemory=512 * 1024 * 1024, directory=None, suffix='.geo', maxDisk=0):
+        self.maxMemory = maxMemory
+        self.maxDisk = maxDisk
+        self.directory = directory
+        self.suffix = suffix
+        self.memoryUsed = 0
+        self.diskUsed = 0
+        self._entries = OrderedDict()
+        # size of the files in the cache directory by key, least recently used first
+        self._files = OrderedDict()
+        self.resetStats()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._scanDirectory()
+
+    def _scanDirectory(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._files[key] = size
+            self.diskUsed += size
+
+    def resetStats(self):
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'diskHits': self.diskHits, 'misses': self.misses,
+                'entries': len(self._entries), 'memoryUsed': self.memoryUsed, 'diskUsed': self.diskUsed}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    ## Look up a serialized geo block
+    #
+    # @param key Key returned by meshKey
+    # @returns   The block or None if it is not cached
+    def get(self, key):
+        block = self._entries.get(key)
+        if block is not None:
+            self._entries.move_to_end(key)
+            if key in self._files:
+                self._files.move_to_end(key)
+            self.hits += 1
+            return block
+
+        if self.directory:
+            try:
+                with open(self._path(key), 'rb') as file:
+                    block = file.read()
+            except OSError:
+                block = None
+            if block is not None:
+                self._remember(key, block)
+                self._touch(key)
+                self.hits += 1
+                self.diskHits += 1
+                return block
+
+        self.misses += 1
+        return None
+
+    ## Store a serialized geo block
+    #
+    # @param key   Key returned by meshKey
+    # @param block The serialized block
+    def put(self, key, block):
+        self._remember(key, block)
+        if self.directory:
+            path = self._path(key)
+            tmpPath = path + '.tmp'
+            try:
+                with open(tmpPath, 'wb') as file:
+                    file.write(block)
+                os.replace(tmpPath, path)
+            except OSError as e:
+                print(f"Could not write cache entry {path}: {e}")
+                return
+            self.diskUsed += len(block) - self._files.pop(key, 0)
+            self._files[key] = len(block)
+            self.trimDisk()
+
+    def clear(self):
+        self._entries.clear()
+        self.memoryUsed = 0
+
+    ## Delete the least recently used files until the cache directory is within maxDisk
+    #
+    #  The newest file is always kept.
+    def trimDisk(self):
+        if self.maxDisk <= 0:
+            return
+        while self.diskUsed > self.maxDisk and len(self._files) > 1:
+            key, size = self._files.popitem(last=False)
+            self.diskUsed -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    ## Mark a file of the cache directory as used
+    def _touch(self, key):
+        if key in self._files:
+            self._files.move_to_end(key)
+        else:
+            try:
+                self._files[key] = os.path.getsize(self._path(key))
+                self.diskUsed += self._files[key]
+            except OSError:
+                return
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _remember(self, key, block):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.memoryUsed -= len(old)
+        self._entries[key] = block
+        self.memoryUsed += len(block)
+        # evict the least recently used blocks, always keep the newest one
+        while self.memoryUsed > self.maxMemory and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.memoryUsed -= len(evicted)
+
+## Default directory of the on disk cache
+def defaultDirectory():
+    return os.path.join(tempfile.gettempdir(), 'vpet_geo_cache')
@@ -0,0 +1,125 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Parallel geometry processing
+#
+#  Builds the geo package blocks of many meshes in a pool of worker processes. The raw mesh
+#  arrays are extracted on the Blender main thread beforehand, the workers only run the bpy
+#  free part: triangle remap, split vertex deduplication, axis swizzle, vertex cache
+#  optimization and packing.
+#
+#  Workers are started with the spawn method and must not import the addon package, whose
+#  __init__ imports bpy. The Source directory is therefore put on sys.path and the worker is
+#  referenced through the top level 'Distribution' package.
+
+import importlib
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from .geoProcessing import buildSplitVertices
+from .meshOptimizer import optimizeVertexCache
+from .packageSerializer import packGeo
+
+## Running pool, kept alive between distributions since starting workers is expensive
+executor = None
+executorWorkers = 0
+## Set when the pool failed once, later runs stay serial
+poolBroken = False
+## Least number of triangle corners worth the overhead of the pool
+minPoolCorners = 200000
+
+## Build the geo package block of a mesh
+#
+#  The index and vertex order is optimized for the vertex cache if raw['optimizeVertexCache'] is set.
+#
+# @param raw Dictionary of mesh arrays, see geoProcessing.buildSplitVertices
+# @returns   Tuple (serialized block, dictionary reporting the optimization, empty if not optimized)
+def buildGeoBlock(raw):
+    geo = buildSplitVertices(raw)
+    report = optimizeVertexCache(geo) if raw.get('optimizeVertexCache') else {}
+    vSize = len(geo['vertices']) // 3
+    skinned = raw['boneWeights'] is not None
+    block = packGeo(SimpleNamespace(vSize=vSize, iSize=len(geo['indices']), nSize=vSize, uvSize=vSize,
+                                    bWSize=vSize if skinned else 0, vertices=geo['vertices'],
+                                    indices=geo['indices'], normals=geo['normals'], uvs=geo['uvs'],
+                                    boneWeights=geo['boneWeights'], boneIndices=geo['boneIndices']))
+    return block, report
+
+## buildGeoBlock as seen by spawned workers
+def importableWorker():
+    source = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if source not in sys.path:
+        sys.path.append(source)
+    return importlib.import_module('Distribution.geoPool').buildGeoBlock
+
+def getExecutor(workers):
+    global executor, executorWorkers
+    if executor is None or executorWorkers != workers:
+        shutdown()
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        executorWorkers = workers
+    return executor
+
+def shutdown():
+    global executor
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+        executor = None
+
+## Build the blocks of many meshes
+#
+#  Runs serially when there is only one job, one worker or too little work to pay for sending
+#  the arrays to the workers, or when the pool can not be used.
+#
+# @param jobs    Dictionary of geo ID to raw mesh arrays
+# @param workers Number of worker processes
+# @returns       Dictionary of geo ID to the result of buildGeoBlock
+def buildGeoBlocks(jobs, workers):
+    global poolBroken
+    corners = sum(raw['triLoops'].size for raw in jobs.values())
+    if workers > 1 and len(jobs) > 1 and corners >= minPoolCorners and not poolBroken:
+        try:
+            pool = getExecutor(workers)
+            worker = importableWorker()
+            futures = {geoID: pool.submit(worker, raw) for geoID, raw in jobs.items()}
+            return {geoID: future.result() for geoID, future in futures.items()}
+        except Exception as e:
+            print(f"Geometry pool failed, processing serially: {e}")
+            poolBroken = True
+            shutdown()
+    return {geoID: buildGeoBlock(raw) for geoID, raw in jobs.items()}
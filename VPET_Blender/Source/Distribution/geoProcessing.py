@@ -0,0 +1,187 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Geometry processing that does not depend on bpy
+#
+#  The functions in this module only work on NumPy arrays that have been
+#  extracted from a Blender mesh beforehand (see sceneDistribution.extractMeshArrays).
+#  Keeping them free of bpy allows to run them outside of the Blender main thread.
+
+import numpy as np
+
+## Record layout used to find identical split vertices
+#  position, normal, uv, bone weights, bone indices
+splitVertexDtype = np.dtype([('co', np.float32, 3),
+                             ('normal', np.float32, 3),
+                             ('uv', np.float32, 2),
+                             ('boneWeights', np.float32, 4),
+                             ('boneIndices', np.int32, 4)])
+
+## Select the strongest bone influences of every vertex
+#
+#  The vertex group weights are given flat, vertex by vertex. They are scattered into a dense
+#  vertices x most influences matrix, the strongest ones are selected with argpartition and
+#  sorted by descending weight. The selected weights are renormalized to sum up to one, unused
+#  slots get weight 0 and index 0.
+#
+# @param counts        Number of vertex groups of every vertex
+# @param groups        Vertex group indices, flat
+# @param weights       Vertex group weights, flat
+# @param maxInfluences Number of influences kept per vertex
+# @returns             Tuple (float32 weights, int32 indices), both vertices x maxInfluences
+def topInfluences(counts, groups, weights, maxInfluences=4):
+    counts = np.asarray(counts, np.int64)
+    numVerts = len(counts)
+    topWeights = np.zeros((numVerts, maxInfluences), np.float32)
+    topIndices = np.zeros((numVerts, maxInfluences), np.int32)
+    if numVerts == 0 or len(groups) == 0:
+        return topWeights, topIndices
+
+    width = max(int(counts.max()), maxInfluences)
+    rows = np.repeat(np.arange(numVerts), counts)
+    starts = np.cumsum(counts) - counts
+    columns = np.arange(len(groups)) - np.repeat(starts, counts)
+    denseWeights = np.full((numVerts, width), -np.inf, np.float32)
+    denseGroups = np.zeros((numVerts, width), np.int32)
+    denseWeights[rows, columns] = weights
+    denseGroups[rows, columns] = groups
+
+    if width > maxInfluences:
+        selected = np.argpartition(-denseWeights, maxInfluences - 1, axis=1)[:, :maxInfluences]
+    else:
+        selected = np.broadcast_to(np.arange(maxInfluences), (numVerts, maxInfluences))
+    selectedWeights = np.take_along_axis(denseWeights, selected, axis=1)
+    order = np.argsort(-selectedWeights, axis=1, kind='stable')
+    selected = np.take_along_axis(selected, order, axis=1)
+    selectedWeights = np.take_along_axis(selectedWeights, order, axis=1)
+
+    used = np.isfinite(selectedWeights)
+    topWeights[used] = selectedWeights[used]
+    topIndices[used] = np.take_along_axis(denseGroups, selected, axis=1)[used]
+    sums = topWeights.sum(axis=1)
+    weighted = sums > 0
+    topWeights[weighted] /= sums[weighted, None]
+    return topWeights, topIndices
+
+## Remove duplicates from a 1D array while keeping the order of first appearance
+#
+# @param records Array of records to deduplicate
+# @returns       Tuple (indices of the first occurences, index buffer pointing into them)
+def uniqueFirstSeen(records):
+    if len(records) == 0:
+        return np.zeros(0, np.int64), np.zeros(0, np.int32)
+
+    keys = np.ascontiguousarray(records).view(np.dtype((np.void, records.dtype.itemsize)))
+    _, firstIndex, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    # np.unique sorts by value, reorder so that vertices keep the order in which they were first used
+    order = np.argsort(firstIndex, kind='stable')
+    rank = np.empty(len(order), np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+
+    return firstIndex[order], rank[inverse.reshape(-1)]
+
+## Compute the normal of every triangle corner
+#
+#  Mirrors the former bmesh based export: if the first polygon is smooth shaded, corners use
+#  the vertex normal unless the adjacent edge is sharp, otherwise the polygon normal is used.
+#  As the faces used to be flipped before the export, the edge adjacent to a corner is the one
+#  leading to the previous corner of the polygon.
+#
+# @param raw        Dictionary of arrays returned by sceneDistribution.extractMeshArrays
+# @param cornerLoop Loop index of every triangle corner
+# @param cornerPoly Polygon index of every triangle corner
+# @returns          Float32 array of shape (corners, 3)
+def cornerNormals(raw, cornerLoop, cornerPoly):
+    polygonNormals = raw['polygonNormals']
+    if not raw['smooth']:
+        return polygonNormals[cornerPoly]
+
+    loopStart = raw['polygonLoopStart'][cornerPoly]
+    loopTotal = raw['polygonLoopTotal'][cornerPoly]
+    previousLoop = loopStart + (cornerLoop - loopStart - 1) % loopTotal
+    sharp = raw['edgeSharp'][raw['loopEdge'][previousLoop]]
+
+    normals = raw['vertexNormals'][raw['loopVertex'][cornerLoop]]
+    normals[sharp] = polygonNormals[cornerPoly[sharp]]
+    return normals
+
+## Build the split vertex buffers of a mesh
+#
+#  Every triangle corner becomes a record of position, normal, uv and skin data. Identical records
+#  are merged into one vertex, the resulting vertices keep the order in which they are first
+#  referenced by the triangles. Positions and normals are swizzled from Blender's Z-up to TRACER's
+#  Y-up space and the triangle winding is inverted accordingly.
+#
+# @param raw Dictionary of arrays returned by sceneDistribution.extractMeshArrays
+# @returns   Dictionary with the flat 'vertices', 'normals', 'uvs', 'indices', 'boneWeights' and
+#            'boneIndices' arrays as they are written to the geo package
+def buildSplitVertices(raw):
+    # the axis swap below mirrors the mesh, invert the winding of every triangle to compensate
+    triLoops = raw['triLoops'][:, [0, 2, 1]]
+    cornerLoop = triLoops.reshape(-1)
+    cornerPoly = np.repeat(raw['triPolygons'], 3)
+    cornerVertex = raw['loopVertex'][cornerLoop]
+
+    records = np.zeros(len(cornerLoop), splitVertexDtype)
+    records['co'] = raw['positions'][cornerVertex]
+    records['normal'] = cornerNormals(raw, cornerLoop, cornerPoly)
+    if raw['loopUVs'] is not None:
+        records['uv'] = raw['loopUVs'][cornerLoop]
+    if raw['boneWeights'] is not None:
+        records['boneWeights'] = raw['boneWeights'][cornerVertex]
+        records['boneIndices'] = raw['boneIndices'][cornerVertex]
+    else:
+        records['boneIndices'] = -1
+
+    # fold negative zeros so that they are merged with positive ones, as float comparison would do
+    for field in ('co', 'normal', 'uv', 'boneWeights'):
+        records[field] += 0.0
+
+    firstCorner, indices = uniqueFirstSeen(records)
+    vertices = records[firstCorner]
+
+    geo = {}
+    geo['vertices'] = np.ascontiguousarray(vertices['co'][:, [0, 2, 1]]).reshape(-1)
+    geo['normals'] = np.ascontiguousarray(vertices['normal'][:, [0, 2, 1]]).reshape(-1)
+    geo['uvs'] = np.ascontiguousarray(vertices['uv']).reshape(-1)
+    geo['indices'] = indices
+    if raw['boneWeights'] is not None:
+        geo['boneWeights'] = np.ascontiguousarray(vertices['boneWeights']).reshape(-1)
+        geo['boneIndices'] = np.ascontiguousarray(vertices['boneIndices']).reshape(-1)
+    else:
+        geo['boneWeights'] = np.zeros(0, np.float32)
+        geo['boneIndices'] = np.zeros(0, np.int32)
+    return geo
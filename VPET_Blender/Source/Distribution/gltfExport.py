@@ -0,0 +1,337 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Binary glTF 2.0 export of the distributed scene
+#
+#  Builds a .glb from the gathered nodes, geometry, materials and textures. The layout of the
+#  binary chunk is planned first, then the whole file is allocated once and the vertex data is
+#  written straight into it with numpy, without going through Python lists.
+#
+#  Every geo entry gets one bufferView with its vertex attributes interleaved (position,
+#  normal, uv, 4 byte aligned) and one with its indices, 16 bit where the vertex count allows.
+#  Clients can upload both to the GPU as they are. Meshes are created per geo entry and
+#  material and share the accessors of the geo entry.
+#
+#  The gathered data is in TRACER coordinates (left handed, Y up), glTF is right handed with
+#  Y up: positions and normals become (s0, s1, -s2), rotations (-s0, -s1, s2, s3), scales stay,
+#  the winding of the triangles is reversed and the v coordinate of uvs is flipped.
+#  Skinned meshes are exported in their bind pose without a skin.
+
+import json
+import math
+import struct
+
+import numpy as np
+
+from .packageSerializer import unpackGeo
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+
+glbHeaderStruct = struct.Struct('<4sII')
+chunkHeaderStruct = struct.Struct('<I4s')
+
+## TRACER adds a rotation of -90 degrees around X to cameras and lights, glTF does not
+cameraRotationFix = np.array([math.sqrt(0.5), 0.0, 0.0, math.sqrt(0.5)])
+
+## Multiply two quaternions given as (x, y, z, w)
+def quaternionProduct(a, b):
+    ax, ay, az, aw = a
+    bx, by, bz, bw = b
+    return (aw * bx + ax * bw + ay * bz - az * by,
+            aw * by - ax * bz + ay * bw + az * bx,
+            aw * bz + ax * by - ay * bx + az * bw,
+            aw * bw - ax * bx - ay * by - az * bz)
+
+## Image mime type from the file content
+#
+# @returns 'image/png', 'image/jpeg' or None for formats glTF does not support
+def imageMimeType(data):
+    if bytes(data[:8]) == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if bytes(data[:3]) == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    return None
+
+## Children of every node of a node list in depth first order with child counts
+#
+# @returns Tuple (list of child index lists, list of top level node indices)
+def nodeHierarchy(nodeList):
+    children = [[] for _ in nodeList]
+    roots = []
+    # (index, children still to come) of the nodes above the current one
+    parents = []
+    for index, node in enumerate(nodeList):
+        while parents and parents[-1][1] == 0:
+            parents.pop()
+        if parents:
+            children[parents[-1][0]].append(index)
+            parents[-1][1] -= 1
+        else:
+            roots.append(index)
+        parents.append([index, node.childCount])
+    return children, roots
+
+def nodeName(node):
+    return bytes(node.name).rstrip(b'\0').decode('utf-8', 'replace')
+
+class GlbBuilder:
+    ## Constructor
+    #
+    # @param nodeTypes  List of node type names, the index of a name is its TRACER type
+    # @param lightTypes List of light type names, the index of a name is its TRACER light type
+    def __init__(self, nodeTypes, lightTypes):
+        self.nodeTypes = nodeTypes
+        self.lightTypes = lightTypes
+        self.gltf = {'asset': {'version': '2.0', 'generator': 'TRACER Scene Distribution Plugin Blender'},
+                     'scene': 0, 'scenes': [{'nodes': []}], 'nodes': [], 'meshes': [], 'materials': [],
+                     'accessors': [], 'bufferViews': [], 'buffers': [{'byteLength': 0}]}
+        self.binSize = 0
+        # functions writing the binary chunk once it is allocated, called with the chunk
+        self.writers = []
+        self.geoPrimitives = []
+        self.meshes = {}
+        self.textureIndices = {}
+
+    ## Reserve space in the binary chunk
+    #
+    # @returns Index of the new bufferView
+    def addBufferView(self, size, target=None, stride=None):
+        offset = self.binSize + -self.binSize % 4
+        self.binSize = offset + size
+        view = {'buffer': 0, 'byteOffset': offset, 'byteLength': size}
+        if target != None:
+            view['target'] = target
+        if stride != None:
+            view['byteStride'] = stride
+        self.gltf['bufferViews'].append(view)
+        return len(self.gltf['bufferViews']) - 1
+
+    def addAccessor(self, accessor):
+        self.gltf['accessors'].append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+    ## Plan the bufferViews and accessors of a geo entry
+    #
+    # @param geo Dictionary of sizes and arrays as returned by unpackGeo
+    def addGeo(self, geo):
+        vSize, iSize = geo['vSize'], geo['iSize']
+        if vSize == 0 or iSize == 0:
+            self.geoPrimitives.append(None)
+            return
+        columns = [('POSITION', geo['vertices'], 3)]
+        if geo['nSize'] == vSize:
+            columns.append(('NORMAL', geo['normals'], 3))
+        if geo['uvSize'] == vSize:
+            columns.append(('TEXCOORD_0', geo['uvs'], 2))
+        stride = sum(width for _, _, width in columns) * 4
+        vertexView = self.addBufferView(vSize * stride, ARRAY_BUFFER, stride)
+
+        attributes = {}
+        offset = 0
+        for name, values, width in columns:
+            accessor = {'bufferView': vertexView, 'byteOffset': offset, 'componentType': FLOAT, 'count': vSize,
+                        'type': f'VEC{width}'}
+            if name == 'POSITION':
+                low = values.reshape(-1, 3).min(axis=0).tolist()
+                high = values.reshape(-1, 3).max(axis=0).tolist()
+                accessor['min'] = [low[0], low[1], -high[2]]
+                accessor['max'] = [high[0], high[1], -low[2]]
+            attributes[name] = self.addAccessor(accessor)
+            offset += width * 4
+
+        indexType, componentType = (np.uint16, UNSIGNED_SHORT) if vSize <= 0xFFFF else (np.uint32, UNSIGNED_INT)
+        indexView = self.addBufferView(iSize * np.dtype(indexType).itemsize, ELEMENT_ARRAY_BUFFER)
+        indices = self.addAccessor({'bufferView': indexView, 'componentType': componentType, 'count': iSize, 'type': 'SCALAR'})
+        self.geoPrimitives.append({'attributes': attributes, 'indices': indices, 'mode': 4})
+
+        def write(chunk):
+            view = self.gltf['bufferViews'][vertexView]
+            target = np.frombuffer(chunk, np.float32, vSize * stride // 4, view['byteOffset']).reshape(vSize, -1)
+            column = 0
+            for name, values, width in columns:
+                target[:, column:column + width] = values.reshape(-1, width)
+                if name == 'TEXCOORD_0':
+                    target[:, column + 1] = 1 - target[:, column + 1]
+                else:
+                    target[:, column + 2] *= -1
+                column += width
+            view = self.gltf['bufferViews'][indexView]
+            target = np.frombuffer(chunk, indexType, iSize, view['byteOffset']).reshape(-1, 3)
+            target[:] = geo['indices'].reshape(-1, 3)[:, ::-1]
+        self.writers.append(write)
+
+    ## Plan an embedded image and its texture
+    #
+    # @param data Content of the image file
+    def addTexture(self, textureId, data):
+        mimeType = imageMimeType(data)
+        if mimeType == None:
+            return
+        imageView = self.addBufferView(len(data))
+        self.gltf.setdefault('images', []).append({'bufferView': imageView, 'mimeType': mimeType})
+        self.gltf.setdefault('textures', []).append({'source': len(self.gltf['images']) - 1})
+        self.textureIndices[textureId] = len(self.gltf['textures']) - 1
+
+        def write(chunk):
+            view = self.gltf['bufferViews'][imageView]
+            chunk[view['byteOffset']:view['byteOffset'] + len(data)] = data
+        self.writers.append(write)
+
+    def addMaterial(self, material):
+        pbr = {'metallicFactor': 0.0, 'roughnessFactor': float(material.roughness)}
+        # like in Blender the color is replaced by a linked texture
+        if material.textureId in self.textureIndices:
+            pbr['baseColorTexture'] = {'index': self.textureIndices[material.textureId]}
+        else:
+            pbr['baseColorFactor'] = [float(value) for value in material.color[:4]]
+        self.gltf['materials'].append({'name': nodeName(material), 'pbrMetallicRoughness': pbr})
+
+    ## Index of the glTF mesh showing a geo entry with a material
+    def mesh(self, geoID, materialID, name):
+        key = (geoID, materialID)
+        if key not in self.meshes:
+            primitive = dict(self.geoPrimitives[geoID])
+            if materialID >= 0:
+                primitive['material'] = materialID
+            self.gltf['meshes'].append({'name': name, 'primitives': [primitive]})
+            self.meshes[key] = len(self.gltf['meshes']) - 1
+        return self.meshes[key]
+
+    def addNode(self, node):
+        position = node.position
+        rotation = (-node.rotation[0], -node.rotation[1], node.rotation[2], node.rotation[3])
+        entry = {'name': nodeName(node),
+                 'translation': [float(position[0]), float(position[1]), -float(position[2])],
+                 'scale': [float(value) for value in node.scale]}
+        nodeType = self.nodeTypes[node.vpetType]
+        if nodeType in ('CAMERA', 'LIGHT'):
+            rotation = quaternionProduct(rotation, cameraRotationFix)
+        entry['rotation'] = [float(value) for value in rotation]
+        if node.editable:
+            entry['extras'] = {'editable': True}
+
+        if nodeType in ('GEO', 'SKINNEDMESH'):
+            geoID = node.geoId if nodeType == 'GEO' else node.geoID
+            if 0 <= geoID < len(self.geoPrimitives) and self.geoPrimitives[geoID] != None:
+                entry['mesh'] = self.mesh(geoID, node.materialId, entry['name'])
+        elif nodeType == 'CAMERA':
+            aspect = float(node.aspect)
+            horizontal = math.radians(node.fov)
+            self.gltf.setdefault('cameras', []).append({'type': 'perspective', 'perspective': {
+                'yfov': 2 * math.atan(math.tan(horizontal / 2) / aspect), 'aspectRatio': aspect,
+                'znear': float(node.near), 'zfar': float(node.far)}})
+            entry['camera'] = len(self.gltf['cameras']) - 1
+        elif nodeType == 'LIGHT':
+            entry['extensions'] = {'KHR_lights_punctual': {'light': self.addLight(node)}}
+        self.gltf['nodes'].append(entry)
+
+    ## Add a KHR_lights_punctual light, area lights become point lights
+    def addLight(self, node):
+        lightType = self.lightTypes[node.lightType]
+        # TRACER intensities are Blender watts / 100, glTF uses candela for point and spot
+        # lights and lux for directional lights
+        watts = float(node.intensity * 100)
+        light = {'color': [float(value) for value in node.color[:3]]}
+        if lightType == 'SUN':
+            light.update(type='directional', intensity=watts)
+        elif lightType == 'SPOT':
+            light.update(type='spot', intensity=watts / (4 * math.pi),
+                         spot={'innerConeAngle': 0.0, 'outerConeAngle': math.radians(node.angle) / 2})
+        else:
+            light.update(type='point', intensity=watts / (4 * math.pi))
+        extension = self.gltf.setdefault('extensions', {}).setdefault('KHR_lights_punctual', {'lights': []})
+        extension['lights'].append(light)
+        self.gltf['extensionsUsed'] = ['KHR_lights_punctual']
+        return len(extension['lights']) - 1
+
+    ## Allocate the .glb and write all planned data into it
+    def build(self):
+        self.gltf['buffers'][0]['byteLength'] = self.binSize
+        for name in ('meshes', 'materials', 'accessors', 'bufferViews'):
+            if not self.gltf[name]:
+                del self.gltf[name]
+        if self.binSize == 0:
+            del self.gltf['buffers']
+        jsonData = json.dumps(self.gltf, separators=(',', ':')).encode()
+        jsonSize = len(jsonData) + -len(jsonData) % 4
+        binSize = self.binSize + -self.binSize % 4
+        size = glbHeaderStruct.size + chunkHeaderStruct.size + jsonSize
+        if binSize > 0:
+            size += chunkHeaderStruct.size + binSize
+
+        glb = bytearray(size)
+        glbHeaderStruct.pack_into(glb, 0, b'glTF', 2, size)
+        offset = glbHeaderStruct.size
+        chunkHeaderStruct.pack_into(glb, offset, jsonSize, b'JSON')
+        offset += chunkHeaderStruct.size
+        glb[offset:offset + jsonSize] = jsonData.ljust(jsonSize, b' ')
+        offset += jsonSize
+        if binSize > 0:
+            chunkHeaderStruct.pack_into(glb, offset, binSize, b'BIN\0')
+            offset += chunkHeaderStruct.size
+            chunk = memoryview(glb)[offset:offset + binSize]
+            for write in self.writers:
+                write(chunk)
+        return glb
+
+## Build a binary glTF of the distributed scene
+#
+# @param nodeList     List of gathered nodes
+# @param nodeTypes    List of node type names, the index of a name is its TRACER type
+# @param lightTypes   List of light type names, the index of a name is its TRACER light type
+# @param geoBlocks    Serialized geo block of every geo entry
+# @param materialList List of gathered materials
+# @param images       Content of the image file of every texture, PNG and JPEG are embedded
+# @returns            The .glb file
+def buildGlb(nodeList, nodeTypes, lightTypes, geoBlocks, materialList, images):
+    builder = GlbBuilder(nodeTypes, lightTypes)
+    for block in geoBlocks:
+        builder.addGeo(unpackGeo(block)[0])
+    for textureId, data in enumerate(images):
+        builder.addTexture(textureId, data)
+    for material in materialList:
+        builder.addMaterial(material)
+    for node in nodeList:
+        builder.addNode(node)
+    children, roots = nodeHierarchy(nodeList)
+    for entry, nodeChildren in zip(builder.gltf['nodes'], children):
+        if nodeChildren:
+            entry['children'] = nodeChildren
+    builder.gltf['scenes'][0]['nodes'] = roots
+    return builder.build()
@@ -0,0 +1,107 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Splitting of meshes for 16 bit index buffers
+#
+#  16 bit indices halve the size of the index buffer, but can only address meshes with less
+#  than 65536 vertices. Larger meshes are cut into parts of consecutive triangles, each part
+#  gets its own compact vertex range. Index 0xFFFF is never used, clients can keep it as the
+#  primitive restart index.
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from .packageSerializer import packGeo, unpackGeo
+
+## Most vertices a part addressed with 16 bit indices may have
+maxIndexedVertices = 0xFFFF
+
+## Triangle ranges of the parts of a mesh
+#
+# @param indices     Triangle list index buffer
+# @param vertexCount Number of vertices
+# @param parts       Number of parts, None to find the fewest parts that fit into 16 bit indices
+# @returns           Array of triangle offsets, part i holds the triangles [bounds[i], bounds[i + 1])
+def partitionTriangles(indices, vertexCount, parts=None):
+    triangles = len(indices) // 3
+    if parts != None:
+        return np.linspace(0, triangles, parts + 1).round().astype(np.int64)
+    parts = max(-(-vertexCount // maxIndexedVertices), 1)
+    while True:
+        bounds = np.linspace(0, triangles, parts + 1).round().astype(np.int64)
+        if parts >= max(triangles, 1) or all(len(np.unique(indices[first * 3:last * 3])) <= maxIndexedVertices
+                                             for first, last in zip(bounds[:-1], bounds[1:])):
+            return bounds
+        parts += 1
+
+## Cut the triangles [first, last) out of a mesh
+#
+#  The vertices keep their relative order, so a vertex fetch optimized order stays intact.
+#
+# @param geo Dictionary of sizes and arrays as returned by unpackGeo
+# @returns   Object providing the geo package attributes of the part
+def geoPart(geo, first, last):
+    used, indices = np.unique(geo['indices'][first * 3:last * 3], return_inverse=True)
+    part = SimpleNamespace(vSize=len(used), iSize=len(indices), indices=indices,
+                           vertices=geo['vertices'].reshape(-1, 3)[used],
+                           nSize=0, normals=np.empty(0, np.float32), uvSize=0, uvs=np.empty(0, np.float32),
+                           bWSize=0, boneWeights=None, boneIndices=None)
+    if geo['nSize'] > 0:
+        part.nSize, part.normals = len(used), geo['normals'].reshape(-1, 3)[used]
+    if geo['uvSize'] > 0:
+        part.uvSize, part.uvs = len(used), geo['uvs'].reshape(-1, 2)[used]
+    if geo['bWSize'] > 0:
+        part.bWSize = len(used)
+        part.boneWeights = geo['boneWeights'].reshape(-1, 4)[used]
+        part.boneIndices = geo['boneIndices'].reshape(-1, 4)[used]
+    return part
+
+## Serialize a geo block with the smallest index width, split into parts if necessary
+#
+# @param block Geo block in the legacy layout
+# @param parts Number of parts, None to split only as far as needed for 16 bit indices
+# @returns     List of geo blocks in the flagged layout, one per part. A part that does not fit into
+#              16 bit indices keeps 32 bit indices
+def compactGeoBlocks(block, parts=None):
+    geo, _ = unpackGeo(block)
+    if parts == None and geo['vSize'] <= maxIndexedVertices:
+        parts = 1
+    if parts == 1:
+        pieces = [SimpleNamespace(**geo)]
+    else:
+        bounds = partitionTriangles(geo['indices'], geo['vSize'], parts)
+        pieces = [geoPart(geo, first, last) for first, last in zip(bounds[:-1], bounds[1:])]
+    return [packGeo(piece, 2 if piece.vSize <= maxIndexedVertices else 4) for piece in pieces]
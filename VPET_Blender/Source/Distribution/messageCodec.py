@@ -0,0 +1,153 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## TRACER update message codec
+#
+#  Every update message starts with a header of client ID, time and message type, followed by
+#  records. A PARAMETERUPDATE record is scene ID, object ID, parameter ID, parameter type and
+#  record length (including these 7 bytes) followed by the parameter data. A LOCK message holds
+#  a single record of scene ID, object ID and lock state.
+#  The codec does not depend on bpy, the decoded records are applied by the caller.
+
+import struct
+from collections import namedtuple
+
+## Message types, same order as VpetData.messageType
+PARAMETERUPDATE, LOCK, SYNC, PING, RESENDUPDATE, UNDOREDOADD, RESETOBJECT, DATAHUB = range(8)
+
+headerStruct = struct.Struct('<BBB')
+parameterStruct = struct.Struct('<BHHBB')
+lockStruct = struct.Struct('<BHB')
+
+## Update of a single parameter, data is the serialized parameter value
+ParameterRecord = namedtuple('ParameterRecord', 'sceneID objID paramID type data')
+## Lock state change of an object
+LockRecord = namedtuple('LockRecord', 'sceneID objID state')
+## Time sync from the server
+SyncRecord = namedtuple('SyncRecord', 'time')
+
+## Decode the message header
+#
+# @returns Tuple (client ID, time, message type)
+def decodeHeader(msg):
+    return headerStruct.unpack_from(msg, 0)
+
+## Decode the records of a message
+#
+#  Truncated or malformed records end the message, everything before them is still returned.
+#
+# @param msg     The message as received
+# @param msgType The message type from the header
+# @returns       List of ParameterRecord and LockRecord
+def decodeRecords(msg, msgType):
+    records = []
+    start = headerStruct.size
+    end = len(msg)
+    if msgType == LOCK:
+        if start + lockStruct.size <= end:
+            records.append(LockRecord(*lockStruct.unpack_from(msg, start)))
+    elif msgType == PARAMETERUPDATE:
+        while start + parameterStruct.size <= end:
+            sceneID, objID, paramID, paramType, length = parameterStruct.unpack_from(msg, start)
+            if length < parameterStruct.size or start + length > end:
+                break
+            records.append(ParameterRecord(sceneID, objID, paramID, paramType,
+                                           msg[start + parameterStruct.size:start + length]))
+            start += length
+    return records
+
+## Drop parameter updates that are superseded by a later update of the same parameter
+#
+#  Updates keep the position of the first update of their parameter but carry the latest
+#  value. Lock records are barriers: updates are never moved across them, so an object is
+#  never changed after it has been locked by another client or before it was unlocked.
+#
+# @param records Records in the order they were received
+# @returns       List of the remaining records
+def coalesce(records):
+    result = []
+    pending = {}
+    for record in records:
+        if type(record) is LockRecord:
+            result.extend(pending.values())
+            pending.clear()
+            result.append(record)
+        else:
+            pending[(record.objID, record.paramID)] = record
+    result.extend(pending.values())
+    return result
+
+## Collects outbound parameter updates and packs them into PARAMETERUPDATE messages
+#
+#  Repeated updates of the same parameter before a flush only send the latest value. The
+#  records are packed into as few messages as possible, each no larger than maxMessageSize
+#  unless a single record does not fit on its own.
+class UpdateBatcher:
+    ## Constructor
+    #
+    # @param maxMessageSize Size limit of a message in bytes, keep it below the network MTU
+    def __init__(self, maxMessageSize=1400):
+        self.maxMessageSize = maxMessageSize
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    ## Queue a parameter update, replacing a pending update of the same parameter
+    #
+    # @param data Serialized parameter value
+    def add(self, sceneID, objID, paramID, paramType, data):
+        self._pending[(objID, paramID)] = (sceneID, paramType, data)
+
+    ## Pack all pending updates into messages
+    #
+    # @param clientID ID of the sending client
+    # @param time     Current time step
+    # @returns        List of messages, empty if nothing is pending
+    def flush(self, clientID, time):
+        messages = []
+        header = headerStruct.pack(clientID, time, PARAMETERUPDATE)
+        msg = bytearray(header)
+        for (objID, paramID), (sceneID, paramType, data) in self._pending.items():
+            length = parameterStruct.size + len(data)
+            if len(msg) > len(header) and len(msg) + length > self.maxMessageSize:
+                messages.append(bytes(msg))
+                msg = bytearray(header)
+            msg += parameterStruct.pack(sceneID, objID, paramID, paramType, length)
+            msg += data
+        if len(msg) > len(header):
+            messages.append(bytes(msg))
+        self._pending.clear()
+        return messages
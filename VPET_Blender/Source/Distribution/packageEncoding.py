@@ -0,0 +1,74 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Alternative encodings of the distribution packages
+#
+#  Packages are encoded once when the scene is gathered, the distribution server then picks
+#  the variant a client accepts (see distributionServer.DistributionServer.reply).
+
+import hashlib
+import time
+import zlib
+
+## Compute the version of a package
+#
+# @param data Package data
+# @returns    Hex digest of the content
+def packageVersion(data):
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+## Compress a package with zlib
+#
+#  The compressed variant is only kept if it saves enough, already compressed data like
+#  PNG or JPEG textures is served as it is.
+#
+# @param data      Package data
+# @param level     zlib compression level, 1 (fast) to 9 (small)
+# @param minSaving Fraction of the size that has to be saved to keep the compressed variant
+# @returns         Tuple (compressed data or None, dictionary of statistics)
+def compressPackage(data, level, minSaving=0.05):
+    start = time.perf_counter()
+    compressed = zlib.compress(data, level)
+    elapsed = time.perf_counter() - start
+
+    size = len(data)
+    worthIt = size > 0 and len(compressed) <= size * (1.0 - minSaving)
+    stats = {'size': size,
+             'compressedSize': len(compressed),
+             'saved': size - len(compressed) if worthIt else 0,
+             'ratio': len(compressed) / size if size > 0 else 1.0,
+             'time': elapsed,
+             'used': worthIt}
+    return (compressed if worthIt else None), stats
@@ -0,0 +1,279 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Serialization of the TRACER packages
+#
+#  Every package is serialized in two passes: first the exact size is computed, then a single
+#  buffer of that size is allocated and filled with precompiled structs and direct array copies.
+
+import struct
+
+import numpy as np
+
+## Precompiled record layouts, native byte order without alignment padding
+headerStruct = struct.Struct('=fii')
+nodeStruct = struct.Struct('=3i3f3f4f64s')
+nodeGeoStruct = struct.Struct('=2i4f')
+nodeLightStruct = struct.Struct('=i3f3f')
+nodeCameraStruct = struct.Struct('=6f')
+nodeSkinnedStruct = struct.Struct('=2i4f2i3f3f')
+materialStruct = struct.Struct('=2i64si64s2i')
+materialTextureStruct = struct.Struct('=i4f')
+textureStruct = struct.Struct('=4i')
+characterStruct = struct.Struct('=3i')
+intStruct = struct.Struct('=i')
+
+## Copy an array into a buffer without intermediate bytes objects
+#
+# @param buffer Target buffer
+# @param offset Byte offset in the target buffer
+# @param values Sequence or array to copy
+# @param dtype  NumPy type the values are written as
+# @returns      Offset behind the written values
+def writeArray(buffer, offset, values, dtype):
+    values = np.asarray(values, dtype).reshape(-1)
+    np.frombuffer(buffer, dtype, len(values), offset)[:] = values
+    return offset + values.nbytes
+
+def serializeHeader(lightIntensityFactor, senderID, frameRate):
+    buffer = bytearray(headerStruct.size)
+    headerStruct.pack_into(buffer, 0, lightIntensityFactor, senderID, frameRate)
+    return buffer
+
+def nodeSize(node, nodeTypes):
+    size = nodeStruct.size
+    if node.vpetType == nodeTypes.index('GEO'):
+        size += nodeGeoStruct.size
+    elif node.vpetType == nodeTypes.index('LIGHT'):
+        size += nodeLightStruct.size
+    elif node.vpetType == nodeTypes.index('CAMERA'):
+        size += nodeCameraStruct.size
+    elif node.vpetType == nodeTypes.index('SKINNEDMESH'):
+        size += nodeSkinnedStruct.size + node.bindPoseLength * 16 * 4 + node.skinnedMeshBoneIDsSize * 4
+    return size
+
+def packNodeInto(buffer, offset, node, nodeTypes):
+    nodeStruct.pack_into(buffer, offset, node.vpetType, node.editable, node.childCount,
+                         *node.position, *node.scale, *node.rotation, bytes(node.name))
+    offset += nodeStruct.size
+
+    if node.vpetType == nodeTypes.index('GEO'):
+        nodeGeoStruct.pack_into(buffer, offset, node.geoId, node.materialId, *node.color)
+        offset += nodeGeoStruct.size
+    elif node.vpetType == nodeTypes.index('LIGHT'):
+        nodeLightStruct.pack_into(buffer, offset, node.lightType, node.intensity, node.angle, node.range, *node.color)
+        offset += nodeLightStruct.size
+    elif node.vpetType == nodeTypes.index('CAMERA'):
+        nodeCameraStruct.pack_into(buffer, offset, node.fov, node.aspect, node.near, node.far, node.focalDist, node.aperture)
+        offset += nodeCameraStruct.size
+    elif node.vpetType == nodeTypes.index('SKINNEDMESH'):
+        nodeSkinnedStruct.pack_into(buffer, offset, node.geoID, node.materialId, *node.color, node.bindPoseLength,
+                                    node.characterRootID, *node.boundExtents, *node.boundCenter)
+        offset += nodeSkinnedStruct.size
+        offset = writeArray(buffer, offset, node.bindPoses[:node.bindPoseLength * 16], np.float32)
+        offset = writeArray(buffer, offset, node.skinnedMeshBoneIDs[:node.skinnedMeshBoneIDsSize], np.int32)
+    return offset
+
+## Serialize the nodes package
+#
+# @param nodeList  List of gathered nodes
+# @param nodeTypes List of node type names, the index of a name is its TRACER type
+def serializeNodes(nodeList, nodeTypes):
+    buffer = bytearray(sum(nodeSize(node, nodeTypes) for node in nodeList))
+    offset = 0
+    for node in nodeList:
+        offset = packNodeInto(buffer, offset, node, nodeTypes)
+    return buffer
+
+## Size of one geo entry in the block layout of the geo package
+#
+# @param indexWidth Bytes per index for the flagged layout, None for the legacy layout
+def geoBlockSize(geo, indexWidth=None):
+    size = 5 * 4 + geo.vSize * 3 * 4 + geo.iSize * 4 + geo.nSize * 3 * 4 + geo.uvSize * 2 * 4
+    if indexWidth != None:
+        size += 4 + indexPadding(geo.iSize, indexWidth) - geo.iSize * (4 - indexWidth)
+    if geo.bWSize > 0:
+        size += geo.bWSize * 4 * 4 * 2
+    return size
+
+## Bytes needed to keep the data behind the indices 4 byte aligned
+def indexPadding(iSize, indexWidth):
+    return -(iSize * indexWidth) % 4
+
+## Write one geo entry in the block layout of the geo package
+#
+#  vSize, vertices, iSize, indices, nSize, normals, uvSize, uvs, bWSize[, boneWeights, boneIndices]
+#
+#  With an index width the flagged layout used by the 'indices' variants of the geo package is
+#  written instead: the index width in bytes (2 or 4) follows iSize and the indices are padded
+#  to a multiple of 4 bytes.
+#
+# @param indexWidth Bytes per index for the flagged layout, None for the legacy layout
+def packGeoInto(buffer, offset, geo, indexWidth=None):
+    intStruct.pack_into(buffer, offset, geo.vSize)
+    offset = writeArray(buffer, offset + 4, geo.vertices, np.float32)
+    intStruct.pack_into(buffer, offset, geo.iSize)
+    offset += 4
+    if indexWidth == None:
+        offset = writeArray(buffer, offset, geo.indices, np.int32)
+    else:
+        intStruct.pack_into(buffer, offset, indexWidth)
+        offset = writeArray(buffer, offset + 4, geo.indices, np.uint16 if indexWidth == 2 else np.int32)
+        offset += indexPadding(geo.iSize, indexWidth)
+    intStruct.pack_into(buffer, offset, geo.nSize)
+    offset = writeArray(buffer, offset + 4, geo.normals, np.float32)
+    intStruct.pack_into(buffer, offset, geo.uvSize)
+    offset = writeArray(buffer, offset + 4, geo.uvs, np.float32)
+    intStruct.pack_into(buffer, offset, geo.bWSize)
+    offset += 4
+    if geo.bWSize > 0:
+        offset = writeArray(buffer, offset, geo.boneWeights, np.float32)
+        offset = writeArray(buffer, offset, geo.boneIndices, np.int32)
+    return offset
+
+## Serialize one geo entry into the block layout of the geo package
+#
+# @param geo        Object providing the geo package attributes (see sceneDistribution.processGeoNew)
+# @param indexWidth Bytes per index for the flagged layout, None for the legacy layout
+# @returns          The serialized block
+def packGeo(geo, indexWidth=None):
+    buffer = bytearray(geoBlockSize(geo, indexWidth))
+    packGeoInto(buffer, 0, geo, indexWidth)
+    return buffer
+
+## Serialize the geo package
+#
+#  Entries that already carry their serialized block in byteData are copied as they are.
+def serializeGeo(geoList):
+    blocks = [getattr(geo, 'byteData', None) for geo in geoList]
+    buffer = bytearray(sum(len(block) if block is not None else geoBlockSize(geo) for geo, block in zip(geoList, blocks)))
+    view = memoryview(buffer)
+    offset = 0
+    for geo, block in zip(geoList, blocks):
+        if block is not None:
+            view[offset:offset + len(block)] = block
+            offset += len(block)
+        else:
+            offset = packGeoInto(buffer, offset, geo)
+    return buffer
+
+## Read a serialized geo block back into arrays
+#
+#  The arrays are read-only views into the block, no data is copied.
+#
+# @param block   Buffer holding one or more geo blocks
+# @param offset  Byte offset of the block to read
+# @param flagged Whether the block uses the flagged layout with an index width, stored as 'indexWidth'
+# @returns      Tuple (dictionary of sizes and arrays, offset behind the block)
+def unpackGeo(block, offset=0, flagged=False):
+    geo = {}
+    for sizeName, arrayName, dtype, width in (('vSize', 'vertices', np.float32, 3),
+                                              ('iSize', 'indices', np.int32, 1),
+                                              ('nSize', 'normals', np.float32, 3),
+                                              ('uvSize', 'uvs', np.float32, 2)):
+        size = intStruct.unpack_from(block, offset)[0]
+        offset += 4
+        geo[sizeName] = size
+        itemSize = 4
+        if arrayName == 'indices' and flagged:
+            itemSize = geo['indexWidth'] = intStruct.unpack_from(block, offset)[0]
+            offset += 4
+            dtype = np.uint16 if itemSize == 2 else np.int32
+        geo[arrayName] = np.frombuffer(block, dtype, size * width, offset)
+        offset += size * width * itemSize
+        if arrayName == 'indices' and flagged:
+            offset += indexPadding(size, itemSize)
+
+    geo['bWSize'] = intStruct.unpack_from(block, offset)[0]
+    offset += 4
+    count = geo['bWSize'] * 4
+    geo['boneWeights'] = np.frombuffer(block, np.float32, count, offset)
+    offset += count * 4
+    geo['boneIndices'] = np.frombuffer(block, np.int32, count, offset)
+    offset += count * 4
+    return geo, offset
+
+## Serialize the materials package
+#
+# @param materialList List of gathered materials
+# @param textureCount Number of textures in the texture package
+def serializeMaterials(materialList, textureCount):
+    size = sum(materialStruct.size + (materialTextureStruct.size if mat.textureId != -1 else 0) for mat in materialList)
+    buffer = bytearray(size)
+    offset = 0
+    for mat in materialList:
+        materialStruct.pack_into(buffer, offset, mat.type, 64, bytes(mat.name), 64, bytes(mat.src), mat.materialID, textureCount)
+        offset += materialStruct.size
+        if mat.textureId != -1:
+            # texture id, offsets and scales
+            materialTextureStruct.pack_into(buffer, offset, mat.textureId, 0, 0, 1, 1)
+            offset += materialTextureStruct.size
+    return buffer
+
+def serializeTextures(textureList):
+    buffer = bytearray(sum(textureStruct.size + tex.colorMapDataSize for tex in textureList))
+    view = memoryview(buffer)
+    offset = 0
+    for tex in textureList:
+        textureStruct.pack_into(buffer, offset, tex.width, tex.height, tex.format, tex.colorMapDataSize)
+        offset += textureStruct.size
+        view[offset:offset + tex.colorMapDataSize] = tex.colorMapData
+        offset += tex.colorMapDataSize
+    return buffer
+
+def serializeCharacters(characterList):
+    size = 0
+    for chr in characterList:
+        size += characterStruct.size + (len(chr.boneMapping) + len(chr.skeletonMapping)) * 4 + chr.sMSize * 10 * 4
+    buffer = bytearray(size)
+    offset = 0
+    for chr in characterList:
+        characterStruct.pack_into(buffer, offset, chr.bMSize, chr.sMSize, chr.characterRootID)
+        offset += characterStruct.size
+        offset = writeArray(buffer, offset, chr.boneMapping, np.int32)
+        offset = writeArray(buffer, offset, chr.skeletonMapping, np.int32)
+        offset = writeArray(buffer, offset, chr.bonePosition[:chr.sMSize * 3], np.float32)
+        offset = writeArray(buffer, offset, chr.boneRotation[:chr.sMSize * 4], np.float32)
+        offset = writeArray(buffer, offset, chr.boneScale[:chr.sMSize * 3], np.float32)
+    return buffer
+
+def serializeCurves(curveList):
+    buffer = bytearray(sum(4 + (len(curve.points) + len(curve.tangents)) * 4 for curve in curveList))
+    offset = 0
+    for curve in curveList:
+        intStruct.pack_into(buffer, offset, curve.pointsLen)
+        offset = writeArray(buffer, offset + 4, curve.points, np.float32)
+        offset = writeArray(buffer, offset, curve.tangents, np.float32)
+    return buffer
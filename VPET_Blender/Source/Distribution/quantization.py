@@ -0,0 +1,212 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Quantized encoding of the geo package
+#
+#  Positions are stored as int16 relative to the center of the axis aligned bounding box of the
+#  mesh, normals octahedral encoded as 2 x int16, uvs as unorm16 relative to their bounding
+#  rectangle and bone weights as unorm8. Indices and bone indices are kept as they are.
+#
+#  Every quantized geo entry starts with its dequantization parameters:
+#  positionOffset (3f), positionScale (3f), uvOffset (2f), uvScale (2f)
+#  followed by the entry in the usual order, every array padded to a multiple of 4 bytes:
+#  vSize, positions, iSize[, indexWidth], indices, nSize, normals, uvSize, uvs, bWSize[, boneWeights, boneIndices]
+#
+#  position = positionOffset + q * positionScale, uv = uvOffset + q * uvScale, weight = q / 255.
+#  The rounding error is at most half a step: positionScale / 2 per axis, uvScale / 2 and
+#  1 / 510 for weights, about 0.003 degrees for normals.
+
+import struct
+
+import numpy as np
+
+from .packageSerializer import intStruct, unpackGeo
+
+quantStruct = struct.Struct('=3f3f2f2f')
+
+## Octahedral encoding of unit vectors
+#
+# @param normals Array of shape (n, 3)
+# @returns       Array of shape (n, 2) with values in [-1, 1]
+def octahedralEncode(normals):
+    normals = np.asarray(normals, np.float64)
+    length = np.abs(normals).sum(axis=1, keepdims=True)
+    length[length == 0] = 1
+    normals = normals / length
+    encoded = normals[:, :2].copy()
+    lower = normals[:, 2] < 0
+    sign = np.where(encoded[lower] >= 0, 1.0, -1.0)
+    encoded[lower] = (1 - np.abs(encoded[lower][:, ::-1])) * sign
+    return encoded
+
+## Decode octahedral encoded unit vectors
+#
+# @param encoded Array of shape (n, 2)
+# @returns       Array of normalized vectors of shape (n, 3)
+def octahedralDecode(encoded):
+    encoded = np.asarray(encoded, np.float64)
+    normals = np.empty((len(encoded), 3))
+    normals[:, :2] = encoded
+    normals[:, 2] = 1 - np.abs(encoded).sum(axis=1)
+    lower = normals[:, 2] < 0
+    sign = np.where(encoded[lower] >= 0, 1.0, -1.0)
+    normals[lower, :2] = (1 - np.abs(encoded[lower][:, ::-1])) * sign
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+## Offset and step to map values into a signed or unsigned 16 bit range
+def quantRange(values, width, signed):
+    if len(values) == 0:
+        return np.zeros(width), np.zeros(width)
+    low = values.min(axis=0).astype(np.float64)
+    high = values.max(axis=0).astype(np.float64)
+    if signed:
+        return (low + high) / 2, (high - low) / 2 / 32767
+    return low, (high - low) / 65535
+
+## Quantize values with an offset and step, constant components quantize to 0
+def quantize(values, offset, scale, dtype):
+    step = np.where(scale > 0, scale, 1)
+    return np.rint((values - offset) / step).astype(dtype)
+
+## Quantize one geo entry
+#
+# @param geo        Dictionary of sizes and arrays as returned by unpackGeo
+# @param indexWidth Bytes per index for the flagged layout, None for the legacy layout
+# @returns          Tuple (quantized block, dictionary of the largest errors)
+def quantizeGeo(geo, indexWidth=None):
+    positions = geo['vertices'].reshape(-1, 3)
+    positionOffset, positionScale = quantRange(positions, 3, True)
+    uvs = geo['uvs'].reshape(-1, 2)
+    uvOffset, uvScale = quantRange(uvs, 2, False)
+
+    sections = [(geo['vSize'], quantize(positions, positionOffset, positionScale, np.int16))]
+    if indexWidth == None:
+        sections.append((geo['iSize'], np.asarray(geo['indices'], np.int32)))
+    else:
+        sections.append(((geo['iSize'], indexWidth), np.asarray(geo['indices'], np.uint16 if indexWidth == 2 else np.int32)))
+    normals = np.rint(octahedralEncode(geo['normals'].reshape(-1, 3)) * 32767).astype(np.int16)
+    sections.append((geo['nSize'], normals))
+    sections.append((geo['uvSize'], quantize(uvs, uvOffset, uvScale, np.uint16)))
+    weights = np.rint(np.clip(geo['boneWeights'], 0, 1) * 255).astype(np.uint8)
+    sections.append((geo['bWSize'], weights))
+    if geo['bWSize'] > 0:
+        sections.append(((), np.asarray(geo['boneIndices'], np.int32)))
+
+    size = quantStruct.size
+    for header, values in sections:
+        size += 4 * len(np.atleast_1d(header)) + values.nbytes + -values.nbytes % 4
+    buffer = bytearray(size)
+    quantStruct.pack_into(buffer, 0, *positionOffset, *positionScale, *uvOffset, *uvScale)
+    offset = quantStruct.size
+    for header, values in sections:
+        for value in np.atleast_1d(header):
+            intStruct.pack_into(buffer, offset, int(value))
+            offset += 4
+        np.frombuffer(buffer, values.dtype, values.size, offset)[:] = values.reshape(-1)
+        offset += values.nbytes + -values.nbytes % 4
+
+    decoded, _ = unpackQuantizedGeo(buffer, 0, indexWidth != None)
+    errors = {'position': maxError(decoded['vertices'], geo['vertices'], 3),
+              'normal': 0.0, 'uv': maxError(decoded['uvs'], geo['uvs'], 2),
+              'weight': maxError(decoded['boneWeights'], geo['boneWeights'], 1)}
+    if geo['nSize'] > 0:
+        original = geo['normals'].reshape(-1, 3).astype(np.float64)
+        original /= np.maximum(np.linalg.norm(original, axis=1, keepdims=True), 1e-12)
+        cosine = np.clip((decoded['normals'].reshape(-1, 3) * original).sum(axis=1), -1, 1)
+        errors['normal'] = float(np.degrees(np.arccos(cosine.min())))
+    return buffer, errors
+
+## Largest distance between original and decoded vectors
+def maxError(decoded, original, width):
+    if len(original) == 0:
+        return 0.0
+    difference = decoded.reshape(-1, width) - original.reshape(-1, width).astype(np.float64)
+    return float(np.linalg.norm(difference, axis=1).max())
+
+## Read a quantized geo entry back into float arrays, like a client decodes it
+#
+# @param block   Buffer holding one or more quantized geo entries
+# @param offset  Byte offset of the entry to read
+# @param flagged Whether the entry uses the flagged layout with an index width
+# @returns       Tuple (dictionary of sizes and arrays like unpackGeo, offset behind the entry)
+def unpackQuantizedGeo(block, offset=0, flagged=False):
+    params = quantStruct.unpack_from(block, offset)
+    offset += quantStruct.size
+    geo = {}
+
+    def read(dtype, count):
+        nonlocal offset
+        values = np.frombuffer(block, dtype, count, offset)
+        offset += values.nbytes + -values.nbytes % 4
+        return values
+
+    def readSize():
+        nonlocal offset
+        offset += 4
+        return intStruct.unpack_from(block, offset - 4)[0]
+
+    geo['vSize'] = readSize()
+    positions = read(np.int16, geo['vSize'] * 3).reshape(-1, 3)
+    geo['vertices'] = (np.array(params[0:3]) + positions * np.array(params[3:6])).reshape(-1)
+    geo['iSize'] = readSize()
+    indexWidth = readSize() if flagged else 4
+    geo['indices'] = read(np.uint16 if indexWidth == 2 else np.int32, geo['iSize'])
+    geo['nSize'] = readSize()
+    normals = read(np.int16, geo['nSize'] * 2).reshape(-1, 2)
+    geo['normals'] = octahedralDecode(normals / 32767).reshape(-1)
+    geo['uvSize'] = readSize()
+    uvs = read(np.uint16, geo['uvSize'] * 2).reshape(-1, 2)
+    geo['uvs'] = (np.array(params[6:8]) + uvs * np.array(params[8:10])).reshape(-1)
+    geo['bWSize'] = readSize()
+    geo['boneWeights'] = read(np.uint8, geo['bWSize'] * 4) / 255
+    geo['boneIndices'] = read(np.int32, geo['bWSize'] * 4)
+    return geo, offset
+
+## Quantize a whole geo package
+#
+# @param package Serialized geo package
+# @param flagged Whether the package uses the flagged layout with an index width
+# @returns       Tuple (quantized package, dictionary of the largest errors over all entries)
+def quantizeGeoPackage(package, flagged=False):
+    blocks = []
+    errors = {'position': 0.0, 'normal': 0.0, 'uv': 0.0, 'weight': 0.0}
+    offset = 0
+    while offset < len(package):
+        geo, offset = unpackGeo(package, offset, flagged)
+        block, blockErrors = quantizeGeo(geo, geo.get('indexWidth'))
+        blocks.append(block)
+        for name, error in blockErrors.items():
+            errors[name] = max(errors[name], error)
+    return b''.join(blocks), errors
@@ -0,0 +1,168 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Scene snapshot files
+#
+#  A snapshot holds all packages of a distribution, including their encoded variants, in one
+#  file. It is written once after gathering and then memory mapped, so the packages are served
+#  straight from the page cache instead of from copies held by Python.
+#
+#  Layout, little endian:
+#  magic 'VPETSNAP', format version (I), entry count (I), snapshot version (16s)
+#  per entry: name length (H), encoding length (H), offset (Q), size (Q), version (16s), name, encoding
+#  followed by the data of the entries, every entry aligned to 64 bytes.
+
+import hashlib
+import mmap
+import os
+import struct
+
+from .packageEncoding import packageVersion
+
+MAGIC = b'VPETSNAP'
+FORMAT_VERSION = 1
+headerStruct = struct.Struct('<8sII16s')
+entryStruct = struct.Struct('<HHQQ16s')
+alignment = 64
+
+## Version of a whole snapshot
+#
+# @param versions Dictionary of package name to package version
+# @returns        Hex digest over the versions of all packages
+def snapshotVersion(versions):
+    digest = hashlib.blake2b(digest_size=8)
+    for name in sorted(versions):
+        digest.update(f'{name}={versions[name]};'.encode())
+    return digest.hexdigest()
+
+## Write the packages into a new snapshot file
+#
+#  The file is named after the snapshot version, so a snapshot that is still mapped is never
+#  overwritten. It is written under a temporary name and renamed when complete.
+#
+# @param directory Directory to write the snapshot to
+# @param packages  Dictionary of package name to package data
+# @param encoded   Dictionary of package name to a dictionary of encoding to encoded data
+# @returns         Path of the snapshot
+def writeSnapshot(directory, packages, encoded=None):
+    encoded = encoded or {}
+    versions = {name: packageVersion(data) for name, data in packages.items()}
+    version = snapshotVersion(versions)
+    entries = []
+    for name, data in packages.items():
+        entries.append((name, 'identity', data, versions[name]))
+        for encoding, encodedData in encoded.get(name, {}).items():
+            entries.append((name, encoding, encodedData, versions[name]))
+
+    table = bytearray()
+    offset = headerStruct.size + sum(entryStruct.size + len(name.encode()) + len(encoding.encode())
+                                     for name, encoding, data, _ in entries)
+    offsets = []
+    for name, encoding, data, entryVersion in entries:
+        offset += -offset % alignment
+        offsets.append(offset)
+        nameBytes, encodingBytes = name.encode(), encoding.encode()
+        table += entryStruct.pack(len(nameBytes), len(encodingBytes), offset, len(data), entryVersion.encode())
+        table += nameBytes + encodingBytes
+        offset += len(data)
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'scene-{version}.vpetsnap')
+    tmpPath = path + '.tmp'
+    with open(tmpPath, 'wb') as file:
+        file.write(headerStruct.pack(MAGIC, FORMAT_VERSION, len(entries), version.encode()))
+        file.write(table)
+        for (name, encoding, data, _), dataOffset in zip(entries, offsets):
+            file.write(bytes(dataOffset - file.tell()))
+            file.write(data)
+    os.replace(tmpPath, path)
+    return path
+
+## Remove the snapshot files of a directory except one
+#
+#  Snapshots that are still mapped can not be removed on every platform, they are left for the
+#  next call.
+def removeSnapshots(directory, keep=None):
+    for fileName in os.listdir(directory):
+        path = os.path.join(directory, fileName)
+        if fileName.endswith('.vpetsnap') and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class Snapshot:
+    ## Map a snapshot file
+    #
+    # @param path Path of the snapshot file
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, formatVersion, count, version = headerStruct.unpack_from(view, 0)
+        if magic != MAGIC or formatVersion != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a snapshot of format version {FORMAT_VERSION}")
+        self.version = version.decode('ascii')
+        ## Package name -> zero-copy view of the package
+        self.packages = {}
+        ## Package name -> dictionary of encoding to zero-copy view
+        self.encoded = {}
+        ## Package name -> package version
+        self.versions = {}
+        offset = headerStruct.size
+        for _ in range(count):
+            nameLength, encodingLength, dataOffset, size, entryVersion = entryStruct.unpack_from(view, offset)
+            offset += entryStruct.size
+            name = bytes(view[offset:offset + nameLength]).decode()
+            encoding = bytes(view[offset + nameLength:offset + nameLength + encodingLength]).decode()
+            offset += nameLength + encodingLength
+            data = view[dataOffset:dataOffset + size]
+            if encoding == 'identity':
+                self.packages[name] = data
+                self.versions[name] = entryVersion.decode('ascii')
+            else:
+                self.encoded.setdefault(name, {})[encoding] = data
+
+    ## Unmap the file
+    #
+    #  Views handed out, e.g. frames still queued for sending, keep the mapping alive, it is
+    #  then unmapped when the last of them is released.
+    def close(self):
+        self.packages, self.encoded = {}, {}
+        try:
+            self._map.close()
+        except BufferError:
+            pass
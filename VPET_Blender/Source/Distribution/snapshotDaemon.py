@@ -0,0 +1,129 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Headless distribution daemon
+#
+#  Serves a scene snapshot baked in Blender (see sceneSnapshot.py) with the same protocol as
+#  the distribution server inside Blender, but without Blender. It only needs pyzmq,
+#  so scene serving can run on its own machine and keeps running while Blender restarts.
+#
+#  Given a directory, the daemon serves the newest snapshot in it and switches to a newer one
+#  as soon as it appears. Clients keep their connection, a reconnecting client sends the
+#  version it has and only downloads the packages that changed.
+#
+#  Run from the Source directory of the add-on:
+#  python -m Distribution.snapshotDaemon --address tcp://*:5555 --workers 4 /path/to/snapshots
+
+import argparse
+import os
+import time
+
+import zmq
+
+from .distributionServer import DistributionServer
+from .sceneSnapshot import Snapshot
+
+## Newest snapshot file
+#
+# @param path Snapshot file or directory of snapshot files
+# @returns    Path of the newest snapshot, None if there is none
+def newestSnapshot(path):
+    if not os.path.isdir(path):
+        return path if os.path.isfile(path) else None
+    snapshots = [os.path.join(path, fileName) for fileName in os.listdir(path) if fileName.endswith('.vpetsnap')]
+    return max(snapshots, key=os.path.getmtime, default=None)
+
+class SnapshotDaemon:
+    ## Constructor
+    #
+    # @param path         Snapshot file or directory of snapshot files
+    # @param address      Address the distribution server binds to
+    # @param workers      Number of threads answering requests
+    # @param maxChunkSize Largest chunk in bytes sent for a chunked request
+    def __init__(self, path, address, workers=4, maxChunkSize=512 * 1024):
+        self.path = path
+        self.context = zmq.Context()
+        self.server = DistributionServer(self.context, address, {}, maxChunkSize=maxChunkSize, workers=workers)
+        self.snapshot = None
+
+    ## Serve the newest snapshot if it is not served yet
+    #
+    # @returns Whether a new snapshot is served
+    def refresh(self):
+        path = newestSnapshot(self.path)
+        if path == None or (self.snapshot != None and self.snapshot.path == path):
+            return False
+        try:
+            snapshot = Snapshot(path)
+        except (OSError, ValueError) as e:
+            # a snapshot that is still being renamed into place is picked up on the next refresh
+            print(f"Could not load snapshot {path}: {e}")
+            return False
+        self.server.publish(snapshot.packages, snapshot.encoded, snapshot.versions, replace=True)
+        if self.snapshot != None:
+            self.snapshot.close()
+        self.snapshot = snapshot
+        print(f"Serving snapshot {snapshot.version} with {len(snapshot.packages)} packages from {path}")
+        return True
+
+    ## Serve until interrupted
+    #
+    # @param interval Seconds between checks for a newer snapshot
+    def run(self, interval=2.0):
+        if not self.refresh():
+            print(f"Waiting for a snapshot in {self.path}")
+        self.server.start()
+        try:
+            while self.server.is_alive():
+                time.sleep(interval)
+                self.refresh()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.stop()
+            self.context.term()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a baked VPET scene snapshot without Blender')
+    parser.add_argument('path', help='snapshot file, or directory to serve the newest snapshot of')
+    parser.add_argument('--address', default='tcp://*:5555', help='address to serve the scene on')
+    parser.add_argument('--workers', type=int, default=4, help='number of threads answering requests')
+    parser.add_argument('--chunk-size', type=int, default=512, help='largest chunk of a chunked request in KB')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between checks for a newer snapshot')
+    args = parser.parse_args(argv)
+    SnapshotDaemon(args.path, args.address, args.workers, args.chunk_size * 1024).run(args.interval)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Update network thread
+#
+#  Owns the subscriber and publisher sockets of the scene update channel and does all of their
+#  I/O on its own thread, so neither viewport interaction nor a slow network stalls the other.
+#  Received messages are decoded on this thread; the resulting records are handed to the Blender
+#  main thread through queues, outbound messages travel the other way. All queues are deques,
+#  whose append and popleft are atomic, so neither side ever takes a lock.
+#
+#  Parameter updates are queued in bounded deques. When one is full the oldest update is dropped
+#  and counted, a newer value of the parameter follows anyway. Everything else, in particular
+#  locks and unlocks, is queued in unbounded deques and never dropped, otherwise an object could
+#  stay locked for good. Every entry carries a sequence number, so both queues of a direction
+#  are taken in the order the entries were queued.
+
+import itertools
+import threading
+from collections import deque
+
+import zmq
+
+from .messageCodec import PARAMETERUPDATE, SYNC, ParameterRecord, SyncRecord, decodeHeader, decodeRecords
+
+## Take the entries of two queues of (sequence number, entry) in sequence order
+#
+# @param droppable Bounded queue whose oldest entries may have been dropped
+# @param reliable  Unbounded queue
+# @param maxCount  Largest number of entries taken
+# @returns         List of entries
+def takeInOrder(droppable, reliable, maxCount):
+    entries = []
+    while len(entries) < maxCount:
+        if droppable and (not reliable or droppable[0][0] < reliable[0][0]):
+            entries.append(droppable.popleft()[1])
+        elif reliable:
+            entries.append(reliable.popleft()[1])
+        else:
+            break
+    return entries
+
+class UpdateNetwork(threading.Thread):
+    ## Constructor
+    #
+    # @param context        ZMQ context to create the sockets with
+    # @param subAddress     Address the scene updates are received from
+    # @param pubAddress     Address the own updates are published to
+    # @param clientID       ID of this client, updates sent by it are ignored
+    # @param inboundSize    Number of parameter records queued for the main thread
+    # @param outboundSize   Number of parameter update messages queued for sending
+    # @param sendInterval   Longest time in seconds an outbound message waits for the thread
+    def __init__(self, context, subAddress, pubAddress, clientID, inboundSize=4096, outboundSize=1024, sendInterval=0.002):
+        super().__init__(name='VPET Update Network', daemon=True)
+        self.context = context
+        self.subAddress = subAddress
+        self.pubAddress = pubAddress
+        self.clientID = clientID
+        self.sendInterval = sendInterval
+        self.inbound = deque(maxlen=inboundSize)
+        self.inboundReliable = deque()
+        self.outbound = deque(maxlen=outboundSize)
+        self.outboundReliable = deque()
+        self._sequence = itertools.count()
+        self.stats = {'received': 0, 'records': 0, 'sent': 0, 'droppedInbound': 0, 'droppedOutbound': 0}
+        self._stopEvent = threading.Event()
+
+    ## Queue a message for sending, callable from any thread
+    #
+    #  Only parameter updates may be dropped when the queue is full.
+    def send(self, msg):
+        entry = (next(self._sequence), msg)
+        if len(msg) < 3 or decodeHeader(msg)[2] != PARAMETERUPDATE:
+            self.outboundReliable.append(entry)
+            return
+        if len(self.outbound) == self.outbound.maxlen:
+            self.stats['droppedOutbound'] += 1
+        self.outbound.append(entry)
+
+    ## Take queued records, called from the main thread
+    #
+    # @param maxCount Largest number of records returned
+    # @returns        List of records in the order they were received
+    def receive(self, maxCount):
+        return takeInOrder(self.inbound, self.inboundReliable, maxCount)
+
+    ## Number of records waiting for the main thread
+    def backlog(self):
+        return len(self.inbound) + len(self.inboundReliable)
+
+    def stop(self):
+        self._stopEvent.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        subscriber = self.context.socket(zmq.SUB)
+        subscriber.setsockopt(zmq.LINGER, 0)
+        subscriber.connect(self.subAddress)
+        subscriber.setsockopt_string(zmq.SUBSCRIBE, "")
+        publisher = self.context.socket(zmq.PUB)
+        publisher.setsockopt(zmq.LINGER, 0)
+        publisher.connect(self.pubAddress)
+        timeout = int(self.sendInterval * 1000) or 1
+
+        while not self._stopEvent.is_set():
+            if subscriber.poll(timeout):
+                while True:
+                    try:
+                        msg = subscriber.recv(zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.decode(msg)
+            while self.outbound or self.outboundReliable:
+                for msg in takeInOrder(self.outbound, self.outboundReliable, 64):
+                    publisher.send(msg)
+                    self.stats['sent'] += 1
+
+        subscriber.close()
+        publisher.close()
+
+    ## Decode a received message into the inbound queue
+    def decode(self, msg):
+        self.stats['received'] += 1
+        if len(msg) < 3:
+            return
+        clientID, msgTime, msgType = decodeHeader(msg)
+        records = decodeRecords(msg, msgType) if clientID != self.clientID else []
+        if msgType == SYNC:
+            records.insert(0, SyncRecord(msgTime))
+        for record in records:
+            entry = (next(self._sequence), record)
+            if isinstance(record, ParameterRecord):
+                if len(self.inbound) == self.inbound.maxlen:
+                    self.stats['droppedInbound'] += 1
+                self.inbound.append(entry)
+            else:
+                self.inboundReliable.append(entry)
+        self.stats['records'] += len(records)
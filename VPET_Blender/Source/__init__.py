@@ -49,6 +49,7 @@ import bpy
 import os
 from .bl_op import DoDistribute
 from .bl_op import StopDistribute
+from .bl_op import BakeSnapshot
 from .bl_op import SetupScene
 from .bl_op import InstallZMQ
 from .bl_op import SetupCharacter
@@ -65,17 +66,20 @@ from .bl_op import InteractionListener
 from .bl_op import ToggleAutoUpdate
 from .bl_op import SendRpcCall
 from .bl_panel import VPET_PT_Panel
+from .bl_panel import VPET_PT_Distribution_Panel
 from .bl_panel import VPET_PT_Anim_Path_Panel
 from .bl_panel import VPET_PT_Control_Points_Panel
 from .bl_panel import VPET_PT_Anim_Path_Menu
 from .tools import initialize
 from .settings import VpetData
 from .settings import VpetProperties
-from .updateTRS import RealTimeUpdaterOperator
+from .updateTRS import RealTimeUpdaterOperator, stop_real_time_updater
+from .Distribution import geoPool
+from .evaluatedMesh import on_geometry_update, on_file_loaded
 from .singleSelect import OBJECT_OT_single_select
 
 # imported classes to register
-classes = (DoDistribute, StopDistribute, SetupScene, VPET_PT_Panel, VPET_PT_Anim_Path_Panel, VPET_PT_Control_Points_Panel, VPET_PT_Anim_Path_Menu, VpetProperties, InstallZMQ, RealTimeUpdaterOperator, OBJECT_OT_single_select,
+classes = (DoDistribute, StopDistribute, BakeSnapshot, SetupScene, VPET_PT_Panel, VPET_PT_Distribution_Panel, VPET_PT_Anim_Path_Panel, VPET_PT_Control_Points_Panel, VPET_PT_Anim_Path_Menu, VpetProperties, InstallZMQ, RealTimeUpdaterOperator, OBJECT_OT_single_select,
            SetupCharacter, MakeEditable, ParentToRoot, AddPath, AddPointAfter, AddPointBefore, ControlPointProps, ControlPointSelect, EditControlPointHandle, UpdateCurveViz, ToggleAutoUpdate, InteractionListener, SendRpcCall) 
 
 def add_menu_path(self, context):
@@ -104,12 +108,20 @@ def register():
 
     bpy.app.handlers.depsgraph_update_post.append(UpdateCurveViz.on_delete_update_handler)   # Adding auto update handler for the animation path. Called any time the scene graph is updated
     bpy.app.handlers.depsgraph_update_post.append(ControlPointProps.update_property_ui)   # Adding auto update handler for the collection of control point properties. Called any time the scene graph is updated
+    bpy.app.handlers.depsgraph_update_post.append(on_geometry_update)   # Counting geometry updates, so unchanged evaluated meshes are not exported again
+    bpy.app.handlers.load_post.append(on_file_loaded)   # Forgetting the evaluated meshes of the previous file
 
     print("Registered VPET Addon")
 
 ## Unregister for removal of Addon
 #
 def unregister():
+    stop_real_time_updater()
+    geoPool.shutdown()
+    if on_geometry_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_geometry_update)
+    if on_file_loaded in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_file_loaded)
     del bpy.types.WindowManager.vpet_data
     
     from bpy.utils import unregister_class
@@ -40,8 +40,9 @@ from mathutils import Vector
 
 from bpy.types import Context
 from .serverAdapter import set_up_thread, close_socket_d, close_socket_s, close_socket_c, close_socket_u
+from .updateTRS import stop_real_time_updater
 from .tools import cleanUp, installZmq, checkZMQ, setupCollections, parent_to_root, add_path, add_point, move_point, update_curve, path_points_check
-from .sceneDistribution import gatherSceneData, resendCurve
+from .sceneDistribution import gatherSceneData, resendCurve, bakeSnapshot
 from .GenerateSkeletonObj import process_armature
 
 
@@ -83,6 +84,27 @@ class DoDistribute(bpy.types.Operator):
         
         return {'FINISHED'}
 
+class BakeSnapshot(bpy.types.Operator):
+    bl_idname = "object.vpet_bake_snapshot"
+    bl_label = "VPET Bake Snapshot"
+    bl_description = 'Write the scene into a snapshot file served by the distribution daemon without Blender'
+
+    def execute(self, context):
+        vpet = context.window_manager.vpet_data
+        # a running distribution already has its packages, gathering again would reset its objects
+        if vpet.distributionServer == None:
+            cleanUp(level=2)
+            objCount = gatherSceneData()
+            cleanUp(level=1)
+            if objCount == 0:
+                self.report({'ERROR'}, 'VPET collections not found or empty')
+                return {'FINISHED'}
+        path = bakeSnapshot()
+        if vpet.distributionServer == None:
+            cleanUp(level=2)
+        self.report({'INFO'}, f'Baked snapshot {path}')
+        return {'FINISHED'}
+
 class StopDistribute(bpy.types.Operator):
     bl_idname = "object.zmq_stopdistribute"
     bl_label = "VPET Stop Distribute"
@@ -570,6 +592,7 @@ class SendRpcCall(bpy.types.Operator):
        
 
 def reset():
+    stop_real_time_updater()
     close_socket_d()
     close_socket_s()
     close_socket_c()
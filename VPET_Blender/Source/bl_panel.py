@@ -64,6 +64,8 @@ class VPET_PT_Panel(VPET_Panel, bpy.types.Panel):
         row = layout.row()
         row.operator('object.zmq_distribute', text = "Do Distribute")
         row.operator('object.zmq_stopdistribute', text = "Stop Distribute")
+        row = layout.row()
+        row.operator('object.vpet_bake_snapshot', text = "Bake Snapshot")
 
         row = layout.row()
         row.prop(bpy.context.scene.vpet_properties, 'vpet_collection')
@@ -78,6 +80,60 @@ class VPET_PT_Panel(VPET_Panel, bpy.types.Panel):
         row = layout.row()
         row.operator('object.rpc', text = "RPC CHANGE LATER")
 
+class VPET_PT_Distribution_Panel(VPET_Panel, bpy.types.Panel):
+    bl_idname = "VPET_PT_DISTRIBUTION_PANEL"
+    bl_label = "Distribution Settings"
+    bl_parent_id = VPET_PT_Panel.bl_idname
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        v_prop = context.scene.vpet_properties
+
+        row = layout.row()
+        row.prop(v_prop, 'compression_level')
+        row.prop(v_prop, 'stream_chunk_size')
+        row = layout.row()
+        row.prop(v_prop, 'use_geo_cache')
+        row.prop(v_prop, 'geo_cache_memory')
+        row = layout.row()
+        row.prop(v_prop, 'geo_cache_dir')
+        row.prop(v_prop, 'geo_cache_disk')
+        row = layout.row()
+        row.prop(v_prop, 'geo_workers')
+        row.prop(v_prop, 'expand_instances')
+        row = layout.row()
+        row.prop(v_prop, 'optimize_vertex_cache')
+        row.prop(v_prop, 'compact_indices')
+        row = layout.row()
+        row.prop(v_prop, 'quantize_geometry')
+        row = layout.row()
+        row.prop(v_prop, 'client_textures')
+        row.prop(v_prop, 'texture_cache_memory')
+        row = layout.row()
+        row.prop(v_prop, 'texture_cache_dir')
+        row.prop(v_prop, 'texture_cache_disk')
+        row = layout.row()
+        row.prop(v_prop, 'texture_size_tablet')
+        row.prop(v_prop, 'texture_size_desktop')
+        row = layout.row()
+        row.prop(v_prop, 'texture_format')
+        row.prop(v_prop, 'texture_quality')
+        row = layout.row()
+        row.prop(v_prop, 'export_gltf')
+        row = layout.row()
+        row.prop(v_prop, 'snapshot_serving')
+        row.prop(v_prop, 'snapshot_dir')
+        row = layout.row()
+        row.prop(v_prop, 'lod_levels')
+        row.prop(v_prop, 'lod_ratio')
+        row = layout.row()
+        row.prop(v_prop, 'evaluated_meshes')
+        row.prop(v_prop, 'evaluated_vertex_budget')
+        row = layout.row()
+        row.prop(v_prop, 'listener_budget')
+        row.prop(v_prop, 'update_message_size')
+
 class VPET_PT_Anim_Path_Panel(VPET_Panel, bpy.types.Panel):
     bl_idname = "VPET_PT_ANIM_PATH_PANEL"
     bl_label = "Animation Path"
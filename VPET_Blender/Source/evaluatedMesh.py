@@ -0,0 +1,144 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Export of meshes with their modifiers applied
+#
+#  Meshes are read from the dependency graph with obj.evaluated_get(depsgraph).to_mesh(), so
+#  subdivision, mirror, array and geometry nodes modifiers are part of the distributed geometry.
+#  The custom property 'VPET-Modifier-Level' of an object selects the modifier settings used:
+#  'VIEWPORT' (default) or 'RENDER'. Render settings are evaluated on a temporary copy of the
+#  object, like the levels of detail in lodGeneration. The modifiers of the artist are not
+#  touched, but linking and removing the copy still changes the scene: the file is marked as
+#  modified and the depsgraph is evaluated again, running every depsgraph handler.
+#
+#  The extracted arrays are kept per object together with the number of geometry updates the
+#  depsgraph reported for it, so objects that did not change are not evaluated again. Objects
+#  are identified by their session_uid, which stays the same when an object is renamed and is
+#  never reused within a session. Both are cleared when a file is loaded.
+
+import bpy
+from bpy.app.handlers import persistent
+
+## Geometry updates reported by the depsgraph, object session_uid -> counter
+geometryGeneration = {}
+## Extracted arrays of evaluated meshes, object session_uid -> (generation, level, raw arrays)
+evaluatedCache = {}
+
+modifierLevelProperty = "VPET-Modifier-Level"
+## Custom property marking the temporary copies made by renderModifierCopy
+renderCopyProperty = "VPET-Render-Copy"
+
+## Count the geometry updates of objects, registered as depsgraph_update_post handler
+#
+#  Persistent, so it keeps counting after a file is loaded. The temporary copies of
+#  renderModifierCopy are not counted.
+@persistent
+def on_geometry_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+            if update.id.original.get(renderCopyProperty):
+                continue
+            key = update.id.original.session_uid
+            geometryGeneration[key] = geometryGeneration.get(key, 0) + 1
+
+## Forget all counters and evaluated meshes, registered as load_post handler
+@persistent
+def on_file_loaded(*args):
+    geometryGeneration.clear()
+    evaluatedCache.clear()
+
+def modifierLevel(obj):
+    level = str(obj.get(modifierLevelProperty, 'VIEWPORT')).upper()
+    return level if level in ('VIEWPORT', 'RENDER') else 'VIEWPORT'
+
+## Temporary copy of an object with the viewport settings of its modifiers set to their render settings
+#
+#  The copy shares the mesh of the object and is linked to the scene so that the depsgraph
+#  evaluates it. The object of the artist is not modified, but the scene is: the file is marked
+#  as modified and the depsgraph handlers run. Remove the copy with bpy.data.objects.remove
+#  afterwards.
+def renderModifierCopy(obj):
+    copy = obj.copy()
+    copy.name = f"{obj.name}_VPET_Render"
+    copy[renderCopyProperty] = True
+    bpy.context.scene.collection.objects.link(copy)
+    for modifier in copy.modifiers:
+        modifier.show_viewport = modifier.show_render
+        if hasattr(modifier, 'render_levels') and hasattr(modifier, 'levels'):
+            modifier.levels = modifier.render_levels
+    return copy
+
+## Read the arrays of a mesh with its modifiers applied
+#
+# @param obj     The mesh object
+# @param extract Function reading the arrays, called with the object and the evaluated mesh
+# @param budget  Largest number of vertices of the evaluated mesh, 0 for no limit
+# @returns       The raw arrays or None if the evaluated mesh exceeds the budget
+def evaluatedMeshArrays(obj, extract, budget=0):
+    level = modifierLevel(obj)
+    key = obj.session_uid
+    generation = geometryGeneration.get(key, 0)
+    cached = evaluatedCache.get(key)
+    if cached and cached[0] == generation and cached[1] == level:
+        return cached[2]
+
+    source = renderModifierCopy(obj) if level == 'RENDER' else obj
+    raw = None
+    try:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        evaluated = source.evaluated_get(depsgraph)
+        data = evaluated.to_mesh()
+        try:
+            if budget > 0 and len(data.vertices) > budget:
+                print(f"{obj.name}: evaluated mesh has {len(data.vertices)} vertices, more than the budget of {budget}. Using the base mesh")
+            else:
+                raw = extract(obj, data)
+        finally:
+            evaluated.to_mesh_clear()
+    finally:
+        if source != obj:
+            bpy.data.objects.remove(source)
+
+    if raw is not None:
+        evaluatedCache[key] = (geometryGeneration.get(key, 0), level, raw)
+    return raw
+
+## Forget the evaluated meshes of objects that are no longer distributed
+#
+# @param keys The session_uid of every distributed object
+def pruneEvaluatedCache(keys):
+    for key in list(evaluatedCache):
+        if key not in keys:
+            del evaluatedCache[key]
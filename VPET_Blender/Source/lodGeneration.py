@@ -0,0 +1,79 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Level of detail generation
+#
+#  Decimated versions of a mesh are made with Blender's decimate modifier on a temporary
+#  object, so the object of the artist is never touched. The temporary object uses the base
+#  mesh, or a copy of the evaluated mesh when modifiers are applied for distribution.
+
+import bpy
+
+## Read the arrays of decimated versions of a mesh
+#
+# @param obj       The mesh object
+# @param ratios    Decimation ratio of every level, the share of faces kept
+# @param extract   Function reading the arrays, called with an object and a mesh
+# @param evaluated Decimate the mesh with the modifiers of the object applied
+# @returns         List of raw arrays, one per ratio
+def decimatedMeshArrays(obj, ratios, extract, evaluated=False):
+    if evaluated:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        data = bpy.data.meshes.new_from_object(obj.evaluated_get(depsgraph))
+    else:
+        data = obj.data
+
+    proxy = bpy.data.objects.new(f"{obj.name}_VPET_LOD", data)
+    bpy.context.scene.collection.objects.link(proxy)
+    modifier = proxy.modifiers.new("VPET LOD", 'DECIMATE')
+    modifier.decimate_type = 'COLLAPSE'
+    modifier.use_collapse_triangulate = True
+
+    raws = []
+    try:
+        for ratio in ratios:
+            modifier.ratio = ratio
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            evaluatedProxy = proxy.evaluated_get(depsgraph)
+            mesh = evaluatedProxy.to_mesh()
+            try:
+                raws.append(extract(proxy, mesh))
+            finally:
+                evaluatedProxy.to_mesh_clear()
+    finally:
+        bpy.data.objects.remove(proxy)
+        if evaluated:
+            bpy.data.meshes.remove(data)
+    return raws
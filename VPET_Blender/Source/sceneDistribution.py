@@ -34,10 +34,14 @@ individual license agreement.
 """
 
 import bpy
+import hashlib
 import math
+import os
+import tempfile
+import time
+from types import SimpleNamespace
 import mathutils
-import bmesh
-import struct
+import numpy as np
 
 from .AbstractParameter import Parameter
 from .SceneObjects.SceneObject import SceneObject
@@ -45,7 +49,22 @@ from .SceneObjects.SceneObjectCamera import SceneObjectCamera
 from .SceneObjects.SceneObjectLight import SceneObjectLight
 from .SceneObjects.SceneObjectSpotLight import SceneObjectSpotLight
 from .SceneObjects.SceneCharacterObject import SceneCharacterObject
+from .sceneRegistry import SceneRegistry
+from .evaluatedMesh import evaluatedMeshArrays, pruneEvaluatedCache
+from .lodGeneration import decimatedMeshArrays
+from .texturePipeline import clientClasses, classTextureEntries, gltfImages, getTextureCache, defaultDirectory as defaultTextureDirectory
 from .Avatar_HumanDescriptioon_Mixamo import blender_to_unity_bone_mapping
+from .serverAdapter import publishPackages, getPackages, packageAttributes
+from .Distribution.geoProcessing import topInfluences
+from .Distribution.geoPool import buildGeoBlocks
+from .Distribution.meshSplitting import compactGeoBlocks
+from .Distribution.quantization import quantizeGeoPackage
+from .Distribution.geoCache import GeoCache, meshKey, derivedKey, defaultDirectory
+from .Distribution.packageEncoding import compressPackage
+from .Distribution.gltfExport import buildGlb
+from .Distribution.sceneSnapshot import Snapshot, writeSnapshot, removeSnapshots
+from .Distribution.packageSerializer import textureStruct, unpackGeo, serializeHeader, serializeNodes, serializeGeo, \
+    serializeMaterials, serializeTextures, serializeCharacters, serializeCurves
 
 
 ## Creating empty classes to store node data
@@ -80,6 +99,37 @@ class characterPackage:
 class curvePackage:
     pass
 
+## Stand-in for a mesh instanced by a collection instance or geometry nodes
+#
+#  Distributed as a non editable GEO node below the object creating the instance, sharing the
+#  geo entry and material of the instanced mesh.
+class InstanceProxy:
+    type = 'INSTANCE'
+    children = ()
+
+    def __init__(self, name, source, parent, matrix_local):
+        self.name = name
+        self.source = source
+        self.parent = parent
+        self.matrix_local = matrix_local
+
+    # no custom properties, in particular never VPET-Editable
+    def __contains__(self, key):
+        return False
+
+    def as_pointer(self):
+        return id(self)
+
+## Geometry cache, kept alive between distributions
+geoCache = None
+## Meshes waiting to be built, (geo ID, level of detail) -> (raw mesh arrays, cache key)
+pendingGeo = {}
+## Geo entries by mesh identifier, geo ID -> number of nodes using it
+geoIndex = {}
+geoReferences = {}
+## Instances expanded below an object, object name -> list of InstanceProxy
+instanceProxies = {}
+
 def initialize():
     global vpet, v_prop
     vpet = bpy.context.window_manager.vpet_data
@@ -92,15 +142,28 @@ def gatherSceneData():
      #cID
     vpet.cID = int(str(v_prop.server_ip).split('.')[3])
     print( vpet.cID)
+    geoIndex.clear()
+    geoReferences.clear()
     objectList = getObjectList()
+    if v_prop.use_geo_cache:
+        getGeoCache().resetStats()
+
+    vpet.registry = SceneRegistry(objectList)
+    # object IDs restart with every distribution
+    vpet.SceneObjects = []
+    SceneObject.s_id = 1
 
     if len(objectList) > 0:
         vpet.objectsToTransfer = objectList
         
 
         #iterate over all objects in the scene
+        pendingGeo.clear()
         for i, n in enumerate(vpet.objectsToTransfer):
             processSceneObject(n, i)
+        processPendingGeometry()
+        pruneEvaluatedCache({geo.mesh.session_uid for geo in vpet.geoList})
+        reportInstancing()
 
         for i, n in enumerate(vpet.objectsToTransfer):
             processEditableObjects(n, i)
@@ -108,14 +171,26 @@ def gatherSceneData():
         getHeaderByteArray()
         getNodesByteArray()
         getGeoBytesArray()
+        getLodByteArrays()
+        getCompactByteArrays()
+        getQuantizedByteArrays()
         getMaterialsByteArray()
         getTexturesByteArray()
+        getClassTexturesByteArrays()
+        getGltfByteArray()
         getCharacterByteArray()
         getCurveByteArray()
+        encodePackages()
+        if v_prop.snapshot_serving:
+            snapshotPackages()
 
         for i, v in enumerate(vpet.nodeList):
             if v.editable == 1:
                 vpet.editableList.append((bytearray(v.name).decode('ascii'), v.vpetType))
+
+        if v_prop.use_geo_cache:
+            stats = getGeoCache().stats()
+            print(f"Geometry cache: {stats['hits']} hits ({stats['diskHits']} from disk), {stats['misses']} misses")
         
         return len(vpet.objectsToTransfer)
     
@@ -127,15 +202,54 @@ def getObjectList():
     parent_object_name = "VPETsceneRoot"
     parent_object = bpy.data.objects.get(parent_object_name)
     objectList = []
+    instanceProxies.clear()
+    if v_prop.expand_instances:
+        collectInstances()
     # TODO OBJ NR 
     recursive_game_object_id_extract(parent_object, objectList)
 
     
     return objectList    
 
+## Find the mesh instances created by collection instances and geometry nodes
+#
+#  Instances are grouped by the object creating them. Instances of objects that are not meshes
+#  and geometry that only exists inside the instancing object can not share a mesh and are skipped.
+def collectInstances():
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    skipped = 0
+    for instance in depsgraph.object_instances:
+        if not instance.is_instance or instance.parent == None:
+            continue
+        host = instance.parent.original
+        source = instance.object.original
+        if source.type != 'MESH' or source == host:
+            skipped += 1
+            continue
+        proxies = instanceProxies.setdefault(host.name, [])
+        matrix = instance.parent.matrix_world.inverted() @ instance.matrix_world
+        proxies.append(InstanceProxy(instanceName(host.name, source.name, len(proxies)), source, host, matrix))
+    if skipped > 0:
+        print(f"Skipped {skipped} instances without a shareable mesh")
+
+## Name of an instance proxy, at most 63 bytes so that it fits into the node name
+#
+#  Long names are cut and made unique again with a hash of the full name.
+def instanceName(hostName, sourceName, index):
+    name = f"{hostName}_{sourceName}_{index}"
+    if len(name.encode()) <= 63:
+        return name
+    suffix = f"_{hashlib.blake2b(name.encode(), digest_size=4).hexdigest()}_{index}"
+    prefix = name.encode()[:63 - len(suffix)].decode('utf-8', 'ignore')
+    return prefix + suffix
+
+## Children of an object in the distributed hierarchy, including expanded instances
+def objectChildren(obj):
+    return list(obj.children) + instanceProxies.get(obj.name, [])
+
 def recursive_game_object_id_extract(location, objectList):
     # Iterate through each child of the location
-    for child in location.children:
+    for child in objectChildren(location):
         # Add the child object to the game_objects list
         print(child.name)
         objectList.append(child)
@@ -197,6 +311,11 @@ def processSceneObject(obj, index):
                 
     
 
+    # instances share geometry and material of the instanced mesh
+    elif obj.type == 'INSTANCE':
+        nodeMesh = sceneMesh()
+        node = processMesh(obj.source, nodeMesh)
+
     elif obj.type == 'ARMATURE':
         node.vpetType = vpet.nodeTypes.index('CHARACTER')
         processCharacter(obj, vpet.objectsToTransfer)
@@ -220,10 +339,10 @@ def processSceneObject(obj, index):
     node.rotation = (rot[1], rot[3], rot[2], rot[0])
     
     node.name = bytearray(64)
-    
-    for i, n in enumerate(obj.name.encode()):
-        node.name[i] = n
-    node.childCount = len(obj.children)
+    # keep the terminating zero byte
+    name = obj.name.encode()[:63]
+    node.name[:len(name)] = name
+    node.childCount = len(objectChildren(obj))
     
     
     if obj.name == 'VPETsceneRoot':
@@ -271,7 +390,7 @@ def processSkinnedMesh(obj, nodeSkinMesh):
     nodeSkinMesh.color = (0,0,0,1)
     nodeSkinMesh.roughness = 0.5
     nodeSkinMesh.materialId = -1
-    nodeSkinMesh.characterRootID = vpet.objectsToTransfer.index(obj.parent)
+    nodeSkinMesh.characterRootID = vpet.registry.objectIndex(obj.parent)
     
     nodeSkinMesh.geoID = processGeoNew(obj)
     # get material of mesh
@@ -310,13 +429,7 @@ def processSkinnedMesh(obj, nodeSkinMesh):
             nodeSkinMesh.bindPoseLength = int(len(bind_poses) / 16)
             nodeSkinMesh.skinnedMeshBoneIDs = [-1] * 99  # Initialize all to -1
             for i, bone in enumerate(armature_data.bones):
-                bone_index = -1
-                for idx, obj in enumerate(vpet.objectsToTransfer):
-                    if obj.name == bone.name:
-                        bone_index = idx
-                        break
-            #for i, bone in enumerate(armature_data.bones):  
-                nodeSkinMesh.skinnedMeshBoneIDs[i] = bone_index
+                nodeSkinMesh.skinnedMeshBoneIDs[i] = vpet.registry.indexOfName(bone.name)
                 
 
         nodeSkinMesh.skinnedMeshBoneIDsSize = len(nodeSkinMesh.skinnedMeshBoneIDs)        
@@ -336,33 +449,20 @@ def processCharacter(armature_obj, object_list):
 
     if armature_obj.type == 'ARMATURE':
         bones = armature_obj.data.bones
-        chr_pack.characterRootID = vpet.objectsToTransfer.index(armature_obj)
+        registry = vpet.registry
+        chr_pack.characterRootID = registry.objectIndex(armature_obj)
 
         if(v_prop.mixamo_humanoid):
             for key, value in blender_to_unity_bone_mapping.items():
-                bone_index = -1
-                for idx, obj in enumerate(object_list):
-                    if key == obj.name:
-                        bone_index = idx
-                        break
-                chr_pack.boneMapping.append(bone_index)
+                chr_pack.boneMapping.append(registry.indexOfName(key))
 
         else:
             for i, bone in enumerate(bones):
-                bone_index = -1
-                for idx, obj in enumerate(vpet.objectsToTransfer):
-                    if obj.name == bone.name:
-                        bone_index = idx
-                        break
-
-                chr_pack.boneMapping.append(bone_index)
+                chr_pack.boneMapping.append(registry.indexOfName(bone.name))
         
         chr_pack.bMSize = len(chr_pack.boneMapping)
         
-        for idx, obj in enumerate(object_list):
-                if obj.name == armature_obj.name:
-                    bone_index = idx
-        chr_pack.skeletonMapping.append(bone_index)
+        chr_pack.skeletonMapping.append(registry.objectIndex(armature_obj))
 
         nodeMatrix = armature_obj.matrix_local.copy()
 
@@ -374,10 +474,7 @@ def processCharacter(armature_obj, object_list):
 
         for mesh in armature_obj.children:
             if mesh.type == 'MESH':
-                for idx, obj in enumerate(object_list):
-                    if obj.name == mesh.name:
-                        bone_index = idx
-                chr_pack.skeletonMapping.append(bone_index)
+                chr_pack.skeletonMapping.append(registry.objectIndex(mesh))
 
                 nodeMatrix = mesh.matrix_local.copy()
 
@@ -389,13 +486,7 @@ def processCharacter(armature_obj, object_list):
 
 
         for bone in armature_obj.pose.bones:
-            bone_index = -1
-            for idx, obj in enumerate(object_list):
-                if obj.name == bone.name:
-                    bone_index = idx
-                    break
-
-            chr_pack.skeletonMapping.append(bone_index)
+            chr_pack.skeletonMapping.append(registry.indexOfName(bone.name))
 
             
             bone_matrix = armature_obj.matrix_world @ bone.matrix 
@@ -585,20 +676,19 @@ def processEditableObjects(obj, index):
 
     if obj.type == 'MESH':
         aaa = SceneObject(obj)
-        vpet.SceneObjects.append(aaa)
     elif obj.type == 'CAMERA':
         aaa = SceneObjectCamera(obj)
-        vpet.SceneObjects.append(aaa)
     elif obj.type == 'LIGHT':
         if obj.data.type == 'SPOT':
             aaa = SceneObjectSpotLight(obj)
-            vpet.SceneObjects.append(aaa)
         else:
             aaa = SceneObjectLight(obj)
-            vpet.SceneObjects.append(aaa)
     elif obj.type == 'ARMATURE':
         aaa = SceneCharacterObject(obj)
-        vpet.SceneObjects.append(aaa)
+    else:
+        return
+    vpet.SceneObjects.append(aaa)
+    vpet.registry.addSceneObject(aaa)
 
 ## Process a meshes material
 #
@@ -691,7 +781,15 @@ def processTexture(tex):
         return -1
     
     texBytes = texFile.read()
-    
+    texFile.close()
+
+    # the same file may be loaded as several images, send its content only once
+    sourceHash = hashlib.blake2b(texBytes, digest_size=20).hexdigest()
+    for i, t in enumerate(vpet.textureList):
+        if t.sourceHash == sourceHash:
+            print(f"Texture {tex.name_full} has the same content as {t.texture}, sending it once")
+            return i
+
     texPack = texturePackage()
     texPack.colorMapData = texBytes
     texPack.colorMapDataSize = len(texBytes)
@@ -700,162 +798,210 @@ def processTexture(tex):
     texPack.format = 0
     
     texPack.texture = tex.name_full
-    
-    texFile.close()
+    texPack.image = tex
+    texPack.sourceHash = sourceHash
 
-    texBinary = bytearray([])
-        
-    #texBinary.extend(struct.pack('i', 0)) #type
-    texBinary.extend(struct.pack('i', texPack.width))
-    texBinary.extend(struct.pack('i', texPack.height))
-    texBinary.extend(struct.pack('i', texPack.format))
-    texBinary.extend(struct.pack('i', texPack.colorMapDataSize))
-    texBinary.extend(texPack.colorMapData)
-    
     vpet.textureList.append(texPack)
     
     # return index of texture in texture list
     return (len(vpet.textureList)-1)
 
-def get_vertex_bone_weights_and_indices(vert):
-    #for vert_idx, vert in enumerate(obj.data.vertices):
-        # Retrieve the vertex groups and their weights for this vertex
-        groups = [(g.group, g.weight) for g in vert.groups]
-        
-        # Sort the groups by weight in descending order
-        groups.sort(key=lambda x: x[1], reverse=True)
-        
-        # Limit to at most 4 bone influences
-        groups = groups[:4]
-        while len(groups) < 4:
-            groups.append((0, 0.0))
-        
-        # Output the bone indices and weights for this vertex
-        bone_indices = [g[0] for g in groups]
-        bone_weights = [g[1] for g in groups]
-        
-        return bone_weights, bone_indices
+## Read the data of a mesh needed for the geo package in bulk
+#
+# @param mesh The mesh object to read
+# @param data The mesh data to read, the base mesh of the object if None
+# @returns    Dictionary of NumPy arrays, see geoProcessing.buildSplitVertices
+def extractMeshArrays(mesh, data=None):
+    if data == None:
+        data = mesh.data
+    data.calc_loop_triangles()
+
+    numVerts = len(data.vertices)
+    numEdges = len(data.edges)
+    numLoops = len(data.loops)
+    numPolys = len(data.polygons)
+    numTris = len(data.loop_triangles)
+
+    raw = {}
+    raw['positions'] = np.empty(numVerts * 3, np.float32)
+    data.vertices.foreach_get('co', raw['positions'])
+    raw['vertexNormals'] = np.empty(numVerts * 3, np.float32)
+    data.vertices.foreach_get('normal', raw['vertexNormals'])
+    raw['edgeSharp'] = np.empty(numEdges, bool)
+    data.edges.foreach_get('use_edge_sharp', raw['edgeSharp'])
+    raw['loopVertex'] = np.empty(numLoops, np.int32)
+    data.loops.foreach_get('vertex_index', raw['loopVertex'])
+    raw['loopEdge'] = np.empty(numLoops, np.int32)
+    data.loops.foreach_get('edge_index', raw['loopEdge'])
+    raw['polygonNormals'] = np.empty(numPolys * 3, np.float32)
+    data.polygons.foreach_get('normal', raw['polygonNormals'])
+    raw['polygonLoopStart'] = np.empty(numPolys, np.int32)
+    data.polygons.foreach_get('loop_start', raw['polygonLoopStart'])
+    raw['polygonLoopTotal'] = np.empty(numPolys, np.int32)
+    data.polygons.foreach_get('loop_total', raw['polygonLoopTotal'])
+    raw['triLoops'] = np.empty(numTris * 3, np.int32)
+    data.loop_triangles.foreach_get('loops', raw['triLoops'])
+    raw['triPolygons'] = np.empty(numTris, np.int32)
+    data.loop_triangles.foreach_get('polygon_index', raw['triPolygons'])
+
+    raw['positions'].shape = (numVerts, 3)
+    raw['vertexNormals'].shape = (numVerts, 3)
+    raw['polygonNormals'].shape = (numPolys, 3)
+    raw['triLoops'].shape = (numTris, 3)
+    raw['smooth'] = numPolys > 0 and data.polygons[0].use_smooth
+
+    raw['loopUVs'] = None
+    if data.uv_layers.active != None:
+        raw['loopUVs'] = np.empty(numLoops * 2, np.float32)
+        data.uv_layers.active.data.foreach_get('uv', raw['loopUVs'])
+        raw['loopUVs'].shape = (numLoops, 2)
+
+    raw['boneWeights'] = None
+    raw['boneIndices'] = None
+    if mesh.parent != None and mesh.parent.type == 'ARMATURE':
+        # vertex groups can not be read with foreach_get, gather them in a single flat pass
+        counts = np.fromiter((len(vert.groups) for vert in data.vertices), np.int32, numVerts)
+        influences = [(g.group, g.weight) for vert in data.vertices for g in vert.groups]
+        groups = np.fromiter((g for g, w in influences), np.int32, len(influences))
+        weights = np.fromiter((w for g, w in influences), np.float32, len(influences))
+        raw['boneWeights'], raw['boneIndices'] = topInfluences(counts, groups, weights)
+
+    return raw
+
+## Read the arrays of a mesh, with its modifiers applied if enabled
+#
+#  Skinned meshes always use the base mesh, the armature modifier would bake the current pose.
+def meshArrays(mesh):
+    isParentArmature = mesh.parent != None and mesh.parent.type == 'ARMATURE'
+    if v_prop.evaluated_meshes and not isParentArmature:
+        raw = evaluatedMeshArrays(mesh, extractMeshArrays, v_prop.evaluated_vertex_budget)
+        if raw != None:
+            return raw
+    return extractMeshArrays(mesh)
+
+## Get the geometry cache configured in the VPET properties
+def getGeoCache():
+    global geoCache
+    directory = bpy.path.abspath(v_prop.geo_cache_dir) if v_prop.geo_cache_dir else defaultDirectory()
+    maxMemory = v_prop.geo_cache_memory * 1024 * 1024
+    maxDisk = v_prop.geo_cache_disk * 1024 * 1024
+    if geoCache == None or geoCache.directory != directory:
+        geoCache = GeoCache(maxMemory, directory, maxDisk=maxDisk)
+    geoCache.maxMemory = maxMemory
+    geoCache.maxDisk = maxDisk
+    return geoCache
 
 def processGeoNew(mesh):
     geoPack = sceneMesh()
     mesh_identifier = generate_mesh_identifier(mesh)
     geoPack.identifier = mesh_identifier
-    vertex_bone_weights = {}
-    vertex_bone_indices = {}
-    isParentArmature = False
-
-    for existing_geo in vpet.geoList:
-        if existing_geo.identifier == mesh_identifier:
-            return vpet.geoList.index(existing_geo)
-
-    if mesh.parent != None:
-        if mesh.parent.type == 'ARMATURE':
-            isParentArmature = True
-            armature = mesh.parent
-            bone_names = {bone.name: idx for idx, bone in enumerate(armature.data.bones)}
-            
 
-            for vert in mesh.data.vertices:
-                weights, indices = get_vertex_bone_weights_and_indices(vert)
-                vertex_bone_weights[vert.index] = weights
-                vertex_bone_indices[vert.index] = indices
-
-    #mesh.data.calc_normals_split()
-    bm = bmesh.new()
-    bm.from_mesh(mesh.data)
-
-    # flipping faces because the following axis swap inverts them
-    for f in bm.faces:
-        bmesh.utils.face_flip(f)
-    bm.normal_update()
-
-    bm.verts.ensure_lookup_table()
-    uv_layer = bm.loops.layers.uv.active
-    loop_triangles = bm.calc_loop_triangles()
-
-    split_verts = {} # vertex data : some unique counted index using hash map for quick lookup
-    index_buffer = []
-    split_index_cur = 0 # index of vert after which the hash_map can later be sorted into a list again
-    num_shared_verts = 0 # just for debugging purposes
-    for tri in loop_triangles:
-        for loop in tri:
-            original_index = loop.vert.index
-            co = loop.vert.co.copy().freeze()
-            uv = loop[uv_layer].uv.copy().freeze()
-
-            if mesh.data.polygons[0].use_smooth:
-                normal = loop.vert.normal.copy().freeze() if loop.edge.smooth else loop.face.normal.copy().freeze()
-            else:
-                normal = loop.face.normal.copy().freeze()
-            
-            bone_weights = [0.0] * 4
-            bone_indices = [-1] * 4
-            if mesh.parent != None:
-                if mesh.parent.type == 'ARMATURE':
-                    bone_weights = vertex_bone_weights.get(original_index, [0.0] * 4)
-                    bone_indices = vertex_bone_indices.get(original_index, [-1] * 4)
-
-            #normal = loop.vert.normal.copy().freeze() if loop.edge.smooth else loop.face.normal.copy().freeze()
-            new_split_vert = (co, normal, uv, tuple(bone_weights), tuple(bone_indices))
-            split_vert_idx = split_verts.get(new_split_vert)
-            if split_vert_idx == None: # no matching vert found, push new one with index and increment for next time
-                split_vert_idx = split_index_cur
-                split_verts[new_split_vert] = split_vert_idx
-                split_index_cur += 1
-            else:
-                num_shared_verts += 1
-            index_buffer.append(split_vert_idx)
-
-    split_vert_items = list(split_verts.items())
-    split_vert_items.sort(key=lambda x: x[1]) #sort by index
-    interleaved_buffer = [item[0] for item in split_vert_items] # strip off index
-    co_buffer, normal_buffer, uv_buffer, bone_weights_buffer, bone_indices_buffer = zip(*interleaved_buffer)
-
-
-    # should unify the list sizes
-    geoPack.vSize = len(co_buffer)
-    geoPack.iSize = len(index_buffer)
-    geoPack.nSize = len(normal_buffer)
-    geoPack.uvSize = len(uv_buffer)
-    geoPack.bWSize = 0
-    geoPack.vertices = []
-    geoPack.indices = []
-    geoPack.normals = []
-    geoPack.uvs = []
-    geoPack.boneWeights = []
-    geoPack.boneIndices = []
-
-    if isParentArmature:
-        for vert_data in interleaved_buffer:
-            _, _, _, vert_bone_weights, vert_bone_indices = vert_data
-            geoPack.boneWeights.extend(vert_bone_weights)
-            geoPack.boneIndices.extend(vert_bone_indices)
-
-        geoPack.bWSize = len(co_buffer)
-
-    for i, vert in enumerate(interleaved_buffer):
-        geoPack.vertices.append(vert[0][0])
-        geoPack.vertices.append(vert[0][2])
-        geoPack.vertices.append(vert[0][1])
-
-        geoPack.normals.append(-vert[1][0])
-        geoPack.normals.append(-vert[1][2])
-        geoPack.normals.append(-vert[1][1])
-        
-        geoPack.uvs.append(vert[2][0])
-        geoPack.uvs.append(vert[2][1])
-    bm.free()
+    if mesh_identifier in geoIndex:
+        geoID = geoIndex[mesh_identifier]
+        geoReferences[geoID] += 1
+        return geoID
+
+    raw = meshArrays(mesh)
+    # part of the raw data so that it is part of the cache key
+    raw['optimizeVertexCache'] = v_prop.optimize_vertex_cache
+    cache = getGeoCache() if v_prop.use_geo_cache else None
+    key = meshKey(raw) if cache else None
+    block = cache.get(key) if cache else None
 
-    
-    geoPack.indices = index_buffer
     geoPack.mesh = mesh
-    
-    
+    geoPack.lods = {}
     vpet.geoList.append(geoPack)
-    return (len(vpet.geoList)-1)
+    geoID = len(vpet.geoList) - 1
+    geoIndex[mesh_identifier] = geoID
+    geoReferences[geoID] = 1
+    if block == None:
+        # built later together with the other meshes, see processPendingGeometry
+        pendingGeo[(geoID, 0)] = (raw, key)
+    else:
+        finishGeo(geoPack, block)
+    if v_prop.lod_levels > 0 and not (mesh.parent != None and mesh.parent.type == 'ARMATURE'):
+        processLods(mesh, geoPack, geoID, key)
+    return geoID
+
+## Queue the decimated levels of detail of a mesh
+#
+#  Levels found in the geometry cache are not decimated again. Skinned meshes have no levels
+#  of detail, the decimation would not keep their vertex groups.
+def processLods(mesh, geoPack, geoID, key):
+    cache = getGeoCache() if v_prop.use_geo_cache else None
+    missing = []
+    for level in range(1, v_prop.lod_levels + 1):
+        ratio = round(v_prop.lod_ratio ** level, 4)
+        lodKey = derivedKey(key, 'lod', ratio) if cache else None
+        block = cache.get(lodKey) if cache else None
+        if block == None:
+            missing.append((level, ratio, lodKey))
+        else:
+            geoPack.lods[level] = block
+    if missing:
+        raws = decimatedMeshArrays(mesh, [ratio for level, ratio, lodKey in missing], extractMeshArrays,
+                                   v_prop.evaluated_meshes)
+        for (level, ratio, lodKey), raw in zip(missing, raws):
+            raw['optimizeVertexCache'] = v_prop.optimize_vertex_cache
+            pendingGeo[(geoID, level)] = (raw, lodKey)
+
+## Fill a geo entry from its serialized block
+def finishGeo(geoPack, block):
+    geo, _ = unpackGeo(block)
+    for name, value in geo.items():
+        setattr(geoPack, name, value)
+    geoPack.byteData = block
+
+## Build the geometry of all meshes that were not found in the cache
+#
+#  Runs the bpy free part in a pool of worker processes, the results are stored by geo ID so
+#  the package order does not depend on which worker finishes first.
+def processPendingGeometry():
+    if not pendingGeo:
+        return
+    workers = v_prop.geo_workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = buildGeoBlocks({job: raw for job, (raw, key) in pendingGeo.items()}, workers)
+    cache = getGeoCache() if v_prop.use_geo_cache else None
+    for job in sorted(results):
+        geoID, level = job
+        raw, key = pendingGeo[job]
+        block, report = results[job]
+        if cache:
+            cache.put(key, block)
+        if level == 0:
+            finishGeo(vpet.geoList[geoID], block)
+        else:
+            vpet.geoList[geoID].lods[level] = block
+        if report:
+            print(f"{vpet.geoList[geoID].mesh.name} (LOD {level}): ACMR {report['acmrBefore']:.3f} -> "
+                  f"{report['acmrAfter']:.3f} in {report['time'] * 1000:.1f} ms")
+    print(f"Built {len(results)} meshes in {time.perf_counter() - start:.2f}s using up to {workers} workers")
+    pendingGeo.clear()
+
+## Print how many geo entries are shared by several mesh nodes
+def reportInstancing():
+    nodes = sum(geoReferences.values())
+    saved = sum((references - 1) * len(vpet.geoList[geoID].byteData) for geoID, references in geoReferences.items())
+    instances = sum(len(proxies) for proxies in instanceProxies.values())
+    print(f"Geometry instancing: {nodes} mesh nodes use {len(geoReferences)} geo entries, "
+          f"{instances} instances expanded, {saved / (1024 * 1024):.2f} MB not sent twice")
+
+## Whether objects using the same mesh datablock get the same geometry
+#
+#  Skinned meshes depend on the vertex groups of the object and meshes with modifiers applied
+#  on the modifiers of the object.
+def canShareMesh(obj):
+    if obj.parent != None and obj.parent.type == 'ARMATURE':
+        return False
+    if v_prop.evaluated_meshes and (len(obj.modifiers) > 0 or obj.data.shape_keys != None):
+        return False
+    return True
 
 def generate_mesh_identifier(obj):
     if obj.type == 'MESH':
+        if canShareMesh(obj):
+            return f"MeshData_{obj.data.as_pointer()}"
         return f"Mesh_{obj.name}_{len(obj.data.vertices)}"
     elif obj.type == 'ARMATURE':
         return f"Armature_{obj.name}_{len(obj.data.bones)}"
@@ -864,148 +1010,281 @@ def generate_mesh_identifier(obj):
 
 ## generate Byte Arrays out of collected node data
 def getHeaderByteArray():
-    global headerByteData
-    headerBin = bytearray([])
-    
     lightIntensityFactor = 1.0
     senderID = int(vpet.cID)
+    frameRate = 60 # frame rate that should be modified later
 
-    headerBin.extend(struct.pack('f', lightIntensityFactor))
-    headerBin.extend(struct.pack('i', senderID))
-    headerBin.extend(struct.pack('i', 60))# frame rate that should be modified later
-
-    vpet.headerByteData.extend(headerBin)
+    vpet.headerByteData = serializeHeader(lightIntensityFactor, senderID, frameRate)
 
 def getNodesByteArray():
-    for node in vpet.nodeList:
-        nodeBinary = bytearray([])
-        
-        nodeBinary.extend(struct.pack('i', node.vpetType))
-        nodeBinary.extend(struct.pack('i', node.editable)) #editable ?
-        nodeBinary.extend(struct.pack('i', node.childCount))
-        nodeBinary.extend(struct.pack('3f', *node.position))
-        nodeBinary.extend(struct.pack('3f', *node.scale))
-        nodeBinary.extend(struct.pack('4f', *node.rotation))
-        nodeBinary.extend(node.name)
-          
-        if (node.vpetType == vpet.nodeTypes.index('GEO')):
-            nodeBinary.extend(struct.pack('i', node.geoId))
-            nodeBinary.extend(struct.pack('i', node.materialId))
-            nodeBinary.extend(struct.pack('4f', *node.color))
-            
-        if (node.vpetType == vpet.nodeTypes.index('LIGHT')):
-            nodeBinary.extend(struct.pack('i', node.lightType))
-            nodeBinary.extend(struct.pack('f', node.intensity))
-            nodeBinary.extend(struct.pack('f', node.angle))
-            nodeBinary.extend(struct.pack('f', node.range))
-            nodeBinary.extend(struct.pack('3f', *node.color))
-            
-        if (node.vpetType == vpet.nodeTypes.index('CAMERA')):
-            nodeBinary.extend(struct.pack('f', node.fov))
-            nodeBinary.extend(struct.pack('f', node.aspect))
-            nodeBinary.extend(struct.pack('f', node.near))
-            nodeBinary.extend(struct.pack('f', node.far))
-            nodeBinary.extend(struct.pack('f', node.focalDist))
-            nodeBinary.extend(struct.pack('f', node.aperture))
-        
-        if (node.vpetType == vpet.nodeTypes.index('SKINNEDMESH')):
-            nodeBinary.extend(struct.pack('i', node.geoID))
-            nodeBinary.extend(struct.pack('i', node.materialId))
-            nodeBinary.extend(struct.pack('4f', *node.color))
-            nodeBinary.extend(struct.pack('i', node.bindPoseLength))
-            nodeBinary.extend(struct.pack('i', node.characterRootID))
-            nodeBinary.extend(struct.pack('3f', *node.boundExtents))
-            nodeBinary.extend(struct.pack('3f', *node.boundCenter))
-            nodeBinary.extend(struct.pack('%sf'% node.bindPoseLength * 16, *node.bindPoses))
-            nodeBinary.extend(struct.pack('%si'% node.skinnedMeshBoneIDsSize, *node.skinnedMeshBoneIDs))
-        
-                    
-        vpet.nodesByteData.extend(nodeBinary)
+    vpet.nodesByteData = serializeNodes(vpet.nodeList, vpet.nodeTypes)
 
 ## pack geo data into byte array
 def getGeoBytesArray():        
-    for geo in vpet.geoList:
-        geoBinary = bytearray([])
-        
-        geoBinary.extend(struct.pack('i', geo.vSize))
-        geoBinary.extend(struct.pack('%sf' % geo.vSize*3, *geo.vertices))
-        geoBinary.extend(struct.pack('i', geo.iSize))
-        geoBinary.extend(struct.pack('%si' % geo.iSize, *geo.indices))
-        geoBinary.extend(struct.pack('i', geo.nSize))
-        geoBinary.extend(struct.pack('%sf' % geo.nSize*3, *geo.normals))
-        geoBinary.extend(struct.pack('i', geo.uvSize))
-        geoBinary.extend(struct.pack('%sf' % geo.uvSize*2, *geo.uvs))
-        geoBinary.extend(struct.pack('i', geo.bWSize))
-        if(geo.bWSize > 0):
-            geoBinary.extend(struct.pack('%sf' % geo.bWSize*4, *geo.boneWeights))
-            geoBinary.extend(struct.pack('%si' % geo.bWSize*4, *geo.boneIndices))
+    vpet.geoByteData = serializeGeo(vpet.geoList)
 
-        
-        vpet.geoByteData.extend(geoBinary)
+## Serialized geometry of a geo entry at a level of detail
+#
+#  Meshes without the requested level use their next coarser existing level or their full geometry.
+def lodBlock(geo, level):
+    for lod in range(level, 0, -1):
+        if lod in geo.lods:
+            return geo.lods[lod]
+    return geo.byteData
+
+## pack the levels of detail into geo packages, served as 'objects?lod=N'
+def getLodByteArrays():
+    for name in [name for name in vpet.variantPackages if name.startswith('objects.lod')]:
+        del vpet.variantPackages[name]
+    for level in range(1, v_prop.lod_levels + 1):
+        entries = [SimpleNamespace(byteData=lodBlock(geo, level)) for geo in vpet.geoList]
+        vpet.variantPackages[f'objects.lod{level}'] = serializeGeo(entries)
+        print(f"Level of detail {level}: {len(vpet.variantPackages[f'objects.lod{level}'])} of {len(vpet.geoByteData)} bytes")
+
+## pack geo and nodes packages with 16 bit indices, served as 'objects?indices=16' and 'nodes?indices=16'
+#
+#  Every geo entry is flagged with its index width. Meshes too large for 16 bit indices are split
+#  into parts, the first part keeps the geo ID of the mesh and the others are appended to the geo
+#  package. The nodes of a split mesh get one extra node per further part, appended to the top
+#  level of the nodes package, so the IDs of all other nodes and geo entries do not change.
+#  Editable and skinned meshes, and meshes below an editable object, are not split and keep 32
+#  bit indices, as the top level part nodes would not follow when a client moves them. Levels of
+#  detail are cut into as many parts as the full mesh.
+def getCompactByteArrays():
+    for name in [name for name in vpet.variantPackages if name.endswith('.indices16')]:
+        del vpet.variantPackages[name]
+    if not v_prop.compact_indices:
+        return
+
+    geoType = vpet.nodeTypes.index('GEO')
+    meshNodes = {}
+    for node in vpet.nodeList:
+        if node.vpetType == geoType:
+            meshNodes.setdefault(node.geoId, []).append(node)
+        elif node.vpetType == vpet.nodeTypes.index('SKINNEDMESH'):
+            meshNodes.setdefault(node.geoID, []).append(node)
+
+    partCounts = []
+    for level in range(0, v_prop.lod_levels + 1):
+        blocks = []
+        extraBlocks = []
+        for geoID, geo in enumerate(vpet.geoList):
+            if level == 0:
+                nodes = meshNodes.get(geoID, [])
+                splittable = all(node.vpetType == geoType and not isEditableBranch(node) for node in nodes)
+                parts = compactGeoBlocks(geo.byteData, None if splittable else 1)
+                partCounts.append(len(parts))
+            else:
+                parts = compactGeoBlocks(lodBlock(geo, level), partCounts[geoID])
+            blocks.append(parts[0])
+            extraBlocks.extend(parts[1:])
+        entries = [SimpleNamespace(byteData=block) for block in blocks + extraBlocks]
+        name = f'objects.lod{level}.indices16' if level > 0 else 'objects.indices16'
+        vpet.variantPackages[name] = serializeGeo(entries)
+
+    nodeList = list(vpet.nodeList)
+    partID = len(vpet.geoList)
+    for geoID, count in enumerate(partCounts):
+        for part in range(1, count):
+            for node in meshNodes.get(geoID, []):
+                nodeList.append(partNode(node, part, partID, len(nodeList)))
+            partID += 1
+    vpet.variantPackages['nodes.indices16'] = serializeNodes(nodeList, vpet.nodeTypes)
+    split = sum(1 for count in partCounts if count > 1)
+    print(f"16 bit indices: {len(vpet.variantPackages['objects.indices16'])} of {len(vpet.geoByteData)} bytes, "
+          f"{split} meshes split into {partID - len(vpet.geoList) + split} parts")
+
+## pack quantized copies of all geo packages, served with 'quant=1', e.g. 'objects?lod=1&quant=1'
+def getQuantizedByteArrays():
+    for name in [name for name in vpet.variantPackages if name.endswith('.quant1')]:
+        del vpet.variantPackages[name]
+    if not v_prop.quantize_geometry:
+        return
+    start = time.perf_counter()
+    geoPackages = {'objects': vpet.geoByteData}
+    geoPackages.update((name, data) for name, data in vpet.variantPackages.items() if name.startswith('objects.'))
+    size = quantizedSize = 0
+    errors = {}
+    for name, data in geoPackages.items():
+        quantized, packageErrors = quantizeGeoPackage(data, name.endswith('.indices16'))
+        vpet.variantPackages[name + '.quant1'] = quantized
+        size += len(data)
+        quantizedSize += len(quantized)
+        for error, value in packageErrors.items():
+            errors[error] = max(errors.get(error, 0.0), value)
+    print(f"Quantized geometry: {quantizedSize} of {size} bytes in {time.perf_counter() - start:.2f}s, largest errors: "
+          f"position {errors['position']:.2e}, normal {errors['normal']:.4f} degrees, uv {errors['uv']:.2e}, "
+          f"weight {errors['weight']:.4f}")
+
+## Whether a node or any of its ancestors is editable
+def isEditableBranch(node):
+    if node.editable:
+        return True
+    obj = vpet.objectsToTransfer[node.vpetId].parent
+    while obj != None and obj.name != 'VPETsceneRoot':
+        if obj.get("VPET-Editable"):
+            return True
+        obj = obj.parent
+    return False
+
+## Node showing a further part of a split mesh
+#
+#  The node is placed at the top level, its transform is the transform of the mesh node
+#  relative to the scene root.
+def partNode(node, part, geoID, index):
+    obj = vpet.objectsToTransfer[node.vpetId]
+    matrix = obj.matrix_local.copy()
+    while obj.parent != None and obj.parent.name != 'VPETsceneRoot':
+        obj = obj.parent
+        matrix = obj.matrix_local @ matrix
+
+    extra = sceneMesh()
+    extra.__dict__.update(node.__dict__)
+    extra.geoId = geoID
+    extra.childCount = 0
+    extra.editable = 0
+    extra.vpetId = index
+    extra.name = bytearray(64)
+    name = bytes(node.name).rstrip(b'\0')[:59] + f'_{part}'.encode()
+    extra.name[:len(name)] = name
+    extra.position = (matrix.to_translation().x, matrix.to_translation().z, matrix.to_translation().y)
+    extra.scale = (matrix.to_scale().x, matrix.to_scale().z, matrix.to_scale().y)
+    rot = matrix.to_quaternion()
+    rot.invert()
+    extra.rotation = (rot[1], rot[3], rot[2], rot[0])
+    return extra
 
 ## pack texture data into byte array        
+#
+#  Every texture is also served on its own as 'texture/<content hash>', the package
+#  'texturehashes' lists the hashes in the order of the textures package, one per line, so that
+#  clients can fetch textures lazily after the geometry.
 def getTexturesByteArray():
-    if len(vpet.textureList) > 0:
-        for tex in vpet.textureList:
-            texBinary = bytearray([])
-    
-            texBinary.extend(struct.pack('i', tex.width))
-            texBinary.extend(struct.pack('i', tex.height))
-            texBinary.extend(struct.pack('i', tex.format))
-            texBinary.extend(struct.pack('i', tex.colorMapDataSize))
-            texBinary.extend(tex.colorMapData)
-            
-            vpet.texturesByteData.extend(texBinary)
+    vpet.texturesByteData = serializeTextures(vpet.textureList)
+    vpet.texturePackages = {}
+    for tex, entry in zip(vpet.textureList, textureEntries(vpet.texturesByteData)):
+        vpet.texturePackages[f'texture/{tex.sourceHash}'] = entry
+    vpet.texturePackages['texturehashes'] = '\n'.join(tex.sourceHash for tex in vpet.textureList).encode('ascii')
+
+## Views of the entries of a textures package, the data is not copied
+def textureEntries(package):
+    view = memoryview(package)
+    offset = 0
+    while offset < len(view):
+        size = textureStruct.size + textureStruct.unpack_from(view, offset)[3]
+        yield view[offset:offset + size]
+        offset += size
+
+## Directory of the texture cache
+def textureCacheDirectory():
+    return bpy.path.abspath(v_prop.texture_cache_dir) if v_prop.texture_cache_dir else defaultTextureDirectory()
+
+## pack the textures prepared for every client class, served as 'textures?class=<name>'
+#
+# A class without any transcoded texture is served the base textures package, unchanged
+# textures of the other classes point to their entries in the base package.
+def getClassTexturesByteArrays():
+    for name in [name for name in vpet.variantPackages if name.startswith('textures.class')]:
+        del vpet.variantPackages[name]
+    if not v_prop.client_textures:
+        return
+    cache = getTextureCache(textureCacheDirectory(), v_prop.texture_cache_memory * 1024 * 1024, v_prop.texture_cache_disk * 1024 * 1024)
+    baseEntries = list(textureEntries(vpet.texturesByteData))
+    for clientClass in clientClasses:
+        start = time.perf_counter()
+        maxSize = getattr(v_prop, f'texture_size_{clientClass}')
+        entries, hits = classTextureEntries(vpet.textureList, maxSize, v_prop.texture_format, v_prop.texture_quality, cache)
+        if all(entry == None for entry in entries):
+            package = vpet.texturesByteData
+            classEntries = baseEntries
+        else:
+            package = bytearray(b''.join(base if entry == None else entry for base, entry in zip(baseEntries, entries)))
+            classEntries = textureEntries(package)
+        del entries
+        vpet.variantPackages[f'textures.class{clientClass}'] = package
+        for tex, entry in zip(vpet.textureList, classEntries):
+            vpet.texturePackages[f'texture/{tex.sourceHash}.class{clientClass}'] = entry
+        print(f"Textures for {clientClass} clients: {len(package)} of {len(vpet.texturesByteData)} bytes, "
+              f"{hits} of {len(vpet.textureList)} from the cache, {time.perf_counter() - start:.2f}s")
+
+## export the scene as binary glTF, served as 'gltf'
+#
+#  Textures are the source image files, only formats glTF cannot embed are converted to PNG.
+def getGltfByteArray():
+    vpet.gltfByteData = bytearray([])
+    if not v_prop.export_gltf:
+        return
+    start = time.perf_counter()
+    cache = getTextureCache(textureCacheDirectory(), v_prop.texture_cache_memory * 1024 * 1024, v_prop.texture_cache_disk * 1024 * 1024)
+    images = gltfImages(vpet.textureList, cache)
+    vpet.gltfByteData = buildGlb(vpet.nodeList, vpet.nodeTypes, vpet.lightTypes, [geo.byteData for geo in vpet.geoList],
+                                 vpet.materialList, images)
+    print(f"glTF export: {len(vpet.gltfByteData)} bytes in {time.perf_counter() - start:.2f}s")
 
 ## pack Material data into byte array        
 def getMaterialsByteArray():
-    if len(vpet.materialList) > 0:
-        for mat in vpet.materialList:
-            matBinary = bytearray([])
-            matBinary.extend(struct.pack('i', mat.type)) #type
-            matBinary.extend(struct.pack('i', 64))# name.size
-            matBinary.extend(mat.name) # mat name
-            matBinary.extend(struct.pack('i', 64)) # src.size
-            matBinary.extend(mat.src) # src
-            matBinary.extend(struct.pack('i', mat.materialID)) # mat id
-            matBinary.extend(struct.pack('i', len(vpet.textureList)))# tex id size
-            if(mat.textureId != -1):
-                matBinary.extend(struct.pack('i', mat.textureId))# tex id
-                matBinary.extend(struct.pack('f', 0)) # tex offsets
-                matBinary.extend(struct.pack('f', 0)) # tex offsets
-                matBinary.extend(struct.pack('f', 1)) # tex scales
-                matBinary.extend(struct.pack('f', 1)) # tex scales
-
-            vpet.materialsByteData.extend(matBinary) 
+    vpet.materialsByteData = serializeMaterials(vpet.materialList, len(vpet.textureList))
 
 def getCharacterByteArray():
-    if len(vpet.characterList):
-        for chr in vpet.characterList:
-            charBinary = bytearray([]) 
-            charBinary.extend(struct.pack('i', chr.bMSize))
-            charBinary.extend(struct.pack('i', chr.sMSize)) 
-            charBinary.extend(struct.pack('i', chr.characterRootID))
-            formatBoneMAping = f'{len(chr.boneMapping)}i'
-            formatSkeletonMAping = f'{len(chr.skeletonMapping)}i'
-            charBinary.extend(struct.pack(formatBoneMAping, *chr.boneMapping))
-            charBinary.extend(struct.pack(formatSkeletonMAping, *chr.skeletonMapping))
-            #TODO WTF IS GOING ON
-            charBinary.extend(struct.pack('%sf' % chr.sMSize*3, *chr.bonePosition))
-            charBinary.extend(struct.pack('%sf' % chr.sMSize*4, *chr.boneRotation))
-            charBinary.extend(struct.pack('%sf' % chr.sMSize*3, *chr.boneScale))
-
-            vpet.charactersByteData.extend(charBinary) 
-
-           
+    vpet.charactersByteData = serializeCharacters(vpet.characterList)
+
 def getCurveByteArray():
     vpet = bpy.context.window_manager.vpet_data
-    for curve in vpet.curveList:
-        curveBinary = bytearray([])
-        curveBinary.extend(struct.pack('i', curve.pointsLen))
-        curveBinary.extend(struct.pack('%sf' % len(curve.points), *curve.points))
-        curveBinary.extend(struct.pack('%sf' % len(curve.tangents), *curve.tangents))
+    vpet.curvesByteData = serializeCurves(vpet.curveList)
 
-        vpet.curvesByteData.extend(curveBinary)
+## Compress the gathered packages for clients accepting compressed transfers
+#
+# @param names Names of the packages to encode, all packages if None
+def encodePackages(names=None):
+    packages = getPackages()
+    for name in (names or packages):
+        vpet.encodedPackages.pop(name, None)
+        vpet.packageStats.pop(name, None)
+        if v_prop.compression_level > 0:
+            compressed, stats = compressPackage(packages[name], v_prop.compression_level)
+            vpet.packageStats[name] = stats
+            if compressed != None:
+                vpet.encodedPackages[name] = {'zlib': compressed}
+            print(f"Compressed {name}: {stats['size']} -> {stats['compressedSize']} bytes, "
+                  f"saved {stats['saved']} bytes in {stats['time'] * 1000:.1f} ms")
+
+## Directory of the snapshot files configured in the VPET properties
+def snapshotDirectory():
+    return bpy.path.abspath(v_prop.snapshot_dir) if v_prop.snapshot_dir else os.path.join(tempfile.gettempdir(), 'vpet_snapshots')
+
+## Bake the current packages into a snapshot for the distribution daemon
+#
+#  Older snapshots in the directory are removed, the daemon switches to the new one.
+#
+# @returns Path of the snapshot
+def bakeSnapshot():
+    initialize()
+    directory = snapshotDirectory()
+    packages = getPackages()
+    if vpet.snapshot != None and all(packages.get(name) is view for name, view in vpet.snapshot.packages.items()):
+        path = vpet.snapshot.path
+    else:
+        path = writeSnapshot(directory, packages, vpet.encodedPackages)
+    removeSnapshots(directory, keep=path)
+    return path
+
+## Write the packages into a snapshot file and serve them from its memory map
+#
+#  The packages are replaced by zero-copy views into the mapped file, so the copies built while
+#  gathering are released and the resident memory stays close to one copy of the data.
+def snapshotPackages():
+    start = time.perf_counter()
+    directory = snapshotDirectory()
+    path = writeSnapshot(directory, getPackages(), vpet.encodedPackages)
+    snapshot = Snapshot(path)
+    for name, attribute in packageAttributes.items():
+        setattr(vpet, attribute, snapshot.packages[name])
+    vpet.variantPackages = {name: snapshot.packages[name] for name in vpet.variantPackages}
+    vpet.texturePackages = {name: snapshot.packages[name] for name in vpet.texturePackages}
+    vpet.encodedPackages = snapshot.encoded
+    vpet.snapshot = snapshot
+    removeSnapshots(directory, keep=path)
+    print(f"Wrote snapshot {path} ({os.path.getsize(path)} bytes) in {time.perf_counter() - start:.2f}s")
 
 def resendCurve():
     vpet = bpy.context.window_manager.vpet_data
@@ -1014,6 +1293,8 @@ def resendCurve():
         vpet.curveList = []
         processCurve_alt(bpy.context.selected_objects[0], vpet.objectsToTransfer)
         getCurveByteArray()
+        encodePackages(['curve'])
+        publishPackages(['curve'])
 
         # TODO MAKE IT NICER AFTER FMX!!!!!
 
@@ -0,0 +1,120 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Central index of the distributed objects
+#
+#  Built once while gathering the scene and shared by everything that needs to map between
+#  Blender objects, their index in the distributed node list and their SceneObject. Objects are
+#  looked up by pointer, so renaming does not break the index; lookups by name use the name at
+#  the time the object was added.
+class SceneRegistry:
+    ## Constructor
+    #
+    # @param objects Objects in the order they are distributed
+    def __init__(self, objects=()):
+        self.objects = []
+        self.indexByPointer = {}
+        self.indexByName = {}
+        # SceneObject -> (pointer, name, ID) it is indexed by
+        self.sceneObjects = {}
+        self.sceneObjectByPointer = {}
+        self.sceneObjectByName = {}
+        self.sceneObjectByID = {}
+        for obj in objects:
+            self.addObject(obj)
+
+    ## Add an object to the distributed objects
+    #
+    # @returns Index of the object
+    def addObject(self, obj):
+        pointer = obj.as_pointer()
+        if pointer in self.indexByPointer:
+            return self.indexByPointer[pointer]
+        index = len(self.objects)
+        self.objects.append(obj)
+        self.indexByPointer[pointer] = index
+        # keep the first object of a name, like the linear searches did
+        self.indexByName.setdefault(obj.name, index)
+        return index
+
+    ## Index of an object in the distributed objects, -1 if it is not distributed
+    def objectIndex(self, obj):
+        return self.indexByPointer.get(obj.as_pointer(), -1)
+
+    ## Index of the object with the given name, -1 if there is none
+    def indexOfName(self, name):
+        return self.indexByName.get(name, -1)
+
+    def addSceneObject(self, sceneObject):
+        obj = sceneObject.editableObject
+        keys = (obj.as_pointer(), obj.name, sceneObject._id)
+        self.sceneObjects[sceneObject] = keys
+        self.sceneObjectByPointer[keys[0]] = sceneObject
+        self.sceneObjectByName[keys[1]] = sceneObject
+        self.sceneObjectByID[keys[2]] = sceneObject
+
+    def removeSceneObject(self, sceneObject):
+        keys = self.sceneObjects.pop(sceneObject, None)
+        if keys is None:
+            return
+        for index, key in zip((self.sceneObjectByPointer, self.sceneObjectByName, self.sceneObjectByID), keys):
+            if index.get(key) is sceneObject:
+                del index[key]
+
+    ## SceneObject of a Blender object, None if it is not editable
+    def sceneObjectFor(self, obj):
+        return self.sceneObjectByPointer.get(obj.as_pointer())
+
+    ## SceneObject of the Blender object with the given name, None if there is none
+    def sceneObjectForName(self, name):
+        return self.sceneObjectByName.get(name)
+
+    ## SceneObject with the given TRACER object ID, None if there is none
+    def sceneObject(self, id):
+        return self.sceneObjectByID.get(id)
+
+    ## Drop SceneObjects whose Blender object was deleted
+    #
+    # @returns Number of removed SceneObjects
+    def prune(self):
+        removed = []
+        for sceneObject in self.sceneObjects:
+            try:
+                sceneObject.editableObject.name
+            except ReferenceError:
+                removed.append(sceneObject)
+        for sceneObject in removed:
+            self.removeSceneObject(sceneObject)
+        return len(removed)
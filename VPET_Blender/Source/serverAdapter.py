@@ -42,6 +42,7 @@ import math
 from collections import deque
 import numpy as np
 from .timer import TimerModalOperator
+from .Distribution.messageCodec import LockRecord, SyncRecord, UpdateBatcher, coalesce
 
 m_pingTimes = deque([0, 0, 0, 0, 0])
 pingRTT = 0
@@ -57,25 +58,25 @@ def set_up_thread():
     # Prepare ZMQ
     vpet.ctx = zmq.Context()
 
-    # Prepare Subscriber
-    vpet.socket_s = vpet.ctx.socket(zmq.SUB)
-    vpet.socket_s.connect(f'tcp://{v_prop.server_ip}:{v_prop.sync_port}')
-    vpet.socket_s.setsockopt_string(zmq.SUBSCRIBE, "")
-    vpet.socket_s.setsockopt(zmq.RCVTIMEO,1)
+    # Prepare update network, it owns the subscriber and the update sender sockets
+    from .Distribution.updateNetwork import UpdateNetwork
+    vpet.network = UpdateNetwork(vpet.ctx, f'tcp://{v_prop.server_ip}:{v_prop.sync_port}',
+                                 f'tcp://{v_prop.server_ip}:{v_prop.update_sender_port}', vpet.cID)
+    vpet.network.start()
+    vpet.updateBatcher = UpdateBatcher(v_prop.update_message_size)
+    vpet.listenerStats = {}
     
 
     
     bpy.app.timers.register(listener)
     
     # Prepare Distributor
-    vpet.socket_d = vpet.ctx.socket(zmq.REP)
-    vpet.socket_d.bind(f'tcp://{v_prop.server_ip}:{v_prop.dist_port}')
-
-    # Prepare poller
-    vpet.poller = zmq.Poller()
-    vpet.poller.register(vpet.socket_d, zmq.POLLIN)    
-
-    bpy.app.timers.register(read_thread)
+    from .Distribution.distributionServer import DistributionServer
+    packages = getPackages()
+    vpet.distributionServer = DistributionServer(vpet.ctx, f'tcp://{v_prop.server_ip}:{v_prop.dist_port}', {},
+                                                 maxChunkSize=v_prop.stream_chunk_size * 1024)
+    vpet.distributionServer.publish(packages, vpet.encodedPackages, snapshotVersions(packages))
+    vpet.distributionServer.start()
 
 
     
@@ -85,9 +86,6 @@ def set_up_thread():
     bpy.utils.register_class(TimerModalOperator)
     bpy.ops.wm.timer_modal_operator()
 
-    vpet.socket_u = vpet.ctx.socket(zmq.PUB)
-    vpet.socket_u.connect(f'tcp://{v_prop.server_ip}:{v_prop.update_sender_port}')
-
     #set_up_thread_socket_c()
 
     
@@ -104,115 +102,107 @@ def set_up_thread_socket_c():
     ping_thread.start()
     print("Ping thread started")
 
-## Read requests and send packages
-def read_thread():
-    global vpet, v_prop
+## Snapshot of the gathered packages served by the distribution server
+#
+#  Variants of packages, like levels of detail, are served under their variant name.
+## Attributes of VpetData holding the packages, by package name
+packageAttributes = {'header': 'headerByteData',
+                     'nodes': 'nodesByteData',
+                     'objects': 'geoByteData',
+                     'characters': 'charactersByteData',
+                     'textures': 'texturesByteData',
+                     'materials': 'materialsByteData',
+                     'curve': 'curvesByteData',
+                     'gltf': 'gltfByteData'}
+
+def getPackages():
     vpet = bpy.context.window_manager.vpet_data
-    v_prop = bpy.context.scene.vpet_properties
-    if vpet.socket_d:
-        # Get sockets with messages (0: don't wait for msgs)
-        sockets = dict(vpet.poller.poll(0))
-        # Check if this socket has a message
-        if vpet.socket_d in sockets:
-            # Receive message
-            msg = vpet.socket_d.recv_string()
-            #print(msg) # debug
-            # Classify message
-            if msg == "header":
-                print("Header request! Sending...")
-                vpet.socket_d.send(vpet.headerByteData)
-            elif msg == "nodes":
-                print("Nodes request! Sending...")
-                vpet.socket_d.send(vpet.nodesByteData)
-            elif msg == "objects":
-                print("Object request! Sending...")
-                vpet.socket_d.send(vpet.geoByteData)
-            elif msg == "characters":
-                print("Characters request! Sending...")
-                if(vpet.charactersByteData != None):
-                    vpet.socket_d.send(vpet.charactersByteData)
-            elif msg == "textures":
-                print("Texture request! Sending...")                
-                if(vpet.textureList != None):
-                    vpet.socket_d.send(vpet.texturesByteData)
-            elif msg == "materials":
-                print("Materials request! Sending...")
-                if(vpet.materialsByteData != None):
-                    vpet.socket_d.send(vpet.materialsByteData)
-            elif msg == "curve":
-                print("curve request! Sending...")
-                if(vpet.curvesByteData != None):
-                    vpet.socket_d.send(vpet.curvesByteData)
-            else: # sent empty
-                vpet.socket_d.send_string("")
-    return 0.1 # repeat every .1 second
+    packages = {name: getattr(vpet, attribute) for name, attribute in packageAttributes.items()}
+    packages.update(vpet.variantPackages)
+    packages.update(vpet.texturePackages)
+    return packages
+
+## Hand the current packages to the running distribution server
+#
+#  The server keeps the packages that are not published again, so only changed packages need
+#  to be passed. Every published package is hashed for its version on the calling thread.
+#
+# @param names Names of the packages to publish, None for all
+def publishPackages(names=None):
+    global vpet
+    vpet = bpy.context.window_manager.vpet_data
+    if vpet.distributionServer:
+        packages = getPackages()
+        if names != None:
+            packages = {name: packages[name] for name in names}
+        vpet.distributionServer.publish(packages, vpet.encodedPackages, snapshotVersions(packages))
+
+## Versions of the packages still served from the snapshot file, they need not be hashed again
+def snapshotVersions(packages):
+    vpet = bpy.context.window_manager.vpet_data
+    if vpet.snapshot == None:
+        return {}
+    return {name: version for name, version in vpet.snapshot.versions.items()
+            if packages.get(name) is vpet.snapshot.packages.get(name)}
 
 global last_sync_time
 last_sync_time = None 
 
 ## process scene updates
+#
+#  The update network receives and decodes the messages on its own thread. The listener takes
+#  the queued records within its time budget, coalesces updates of the same parameter to the
+#  latest value and applies them to the scene.
 def listener():
     global vpet, v_prop, last_sync_time
     vpet = bpy.context.window_manager.vpet_data
     v_prop = bpy.context.scene.vpet_properties
-    msg = None
-    
-    try:
-        msg = vpet.socket_s.recv()
-    except Exception as e:
-        msg = None
-
-
-
-    if (msg != None ):  
-        clientID = msg[0]
-        
-        if(vpet.messageType[msg[2]] == "SYNC"):
-            current_time = time.time()
-            sv_time = msg[1]
-            runtime = int(pingRTT * 0.5)
-            syncTime = sv_time + runtime
-            delta = delta_time(vpet.time, sv_time, TimerModalOperator.my_instance.m_timesteps)
-            if delta > 10 or delta>3 and runtime < 8:
-                vpet.time = int(round(sv_time)) % TimerModalOperator.my_instance.m_timesteps
-
-        if clientID != vpet.cID:
-            msgtime = msg[1]
-            type = vpet.messageType[msg[2]]
-            #print(type)
-  
-            start = 3
-
-            while(start < len(msg)):
-                
-                if(type == "LOCK"):
-                    objID = msg[start+1]
-                    if 0 < objID <= len(vpet.SceneObjects):
-                        lockstate = msg[start+3]
-                        vpet.SceneObjects[objID - 1].LockUnlock(lockstate)
-
-                    start = len(msg)
-                
-                elif(type == "PARAMETERUPDATE"):
-                    sceneID = msg[start]
-                    objID = msg[start+1]
-                    paramID = msg[start+3]
-                    length = msg[start+6]
-                    parameterData = msg[start+7]
-
-                    if 0 < objID <= len(vpet.SceneObjects) and 0 <= paramID < len(vpet.SceneObjects[objID - 1]._parameterList):
-                        param = vpet.SceneObjects[objID - 1]._parameterList[paramID]
-                        param.decodeMsg(msg, start+7)
-                    
-                    start += length
-
-                else:
-                    start = len(msg)
-
-
-                
-            
-    return 0.01 # repeat every .1 second
+    deadline = time.perf_counter() + v_prop.listener_budget / 1000
+    records = []
+
+    while time.perf_counter() < deadline:
+        received = vpet.network.receive(256)
+        if not received:
+            break
+        for record in received:
+            if type(record) is SyncRecord:
+                applySync(record.time)
+            else:
+                records.append(record)
+
+    updates = coalesce(records)
+    applyUpdates(updates)
+    flushUpdates()
+
+    backlog = vpet.network.backlog()
+    stats = vpet.listenerStats
+    stats.update(vpet.network.stats)
+    stats['drained'] = len(records)
+    stats['applied'] = len(updates)
+    stats['backlog'] = backlog
+    stats['peakDrained'] = max(stats.get('peakDrained', 0), len(records))
+
+    # come back right away if records are still queued
+    return 0.001 if backlog else 0.01
+
+## Adopt the server time if the local time drifted too far
+def applySync(sv_time):
+    runtime = int(pingRTT * 0.5)
+    delta = delta_time(vpet.time, sv_time, TimerModalOperator.my_instance.m_timesteps)
+    if delta > 10 or delta>3 and runtime < 8:
+        vpet.time = int(round(sv_time)) % TimerModalOperator.my_instance.m_timesteps
+
+## Apply decoded update records to the scene objects
+def applyUpdates(records):
+    registry = vpet.registry
+    for record in records:
+        sceneObject = registry.sceneObject(record.objID)
+        if sceneObject is None:
+            continue
+        if type(record) is LockRecord:
+            sceneObject.LockUnlock(record.state)
+        elif record.paramID < len(sceneObject._parameterList):
+            sceneObject._parameterList[record.paramID].decodeMsg(record.data, 0)
                 
 ## Stopping the thread and closing the sockets
 
@@ -258,23 +248,28 @@ def DecodePongMessage(msg):
         pingRTT = round((rttSum - rttMax) / (pingCount - 1))
     
 
+## Queue an update message on the update network
+def sendUpdate(msg):
+    if vpet.network:
+        vpet.network.send(bytes(msg))
+
+## Queue a parameter update, it is sent with the next flush of the update batcher
 def SendParameterUpdate(parameter):
-    vpet.ParameterUpdateMSG = bytearray([])
-    vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.cID))
-    vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.time))
-    vpet.ParameterUpdateMSG.extend(struct.pack('B', 0))
-    vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.cID))
-    vpet.ParameterUpdateMSG.extend(struct.pack('H', parameter._parent._id))
-    vpet.ParameterUpdateMSG.extend(struct.pack('H', parameter._id))
-    vpet.ParameterUpdateMSG.extend(struct.pack('B', parameter._type))
-    length = 7+ parameter._dataSize
-    vpet.ParameterUpdateMSG.extend(struct.pack('B', length))
-    vpet.ParameterUpdateMSG.extend(parameter.SerializeParameter())
+    if vpet.updateBatcher is None:
+        return
+    vpet.updateBatcher.add(vpet.cID, parameter._parent._id, parameter._id, parameter._type,
+                           parameter.SerializeParameter())
 
-    vpet.socket_u.send(vpet.ParameterUpdateMSG)
+## Send all queued parameter updates as few batched messages
+def flushUpdates():
+    if vpet.updateBatcher:
+        for msg in vpet.updateBatcher.flush(vpet.cID, vpet.time):
+            sendUpdate(msg)
 
 
 def SendLockMSG(sceneObject):
+    # updates queued before the lock must not arrive after it
+    flushUpdates()
     vpet.ParameterUpdateMSG = bytearray([])
     vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.cID))
     vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.time))
@@ -282,9 +277,10 @@ def SendLockMSG(sceneObject):
     vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.cID))
     vpet.ParameterUpdateMSG.extend(struct.pack('H', sceneObject._id))
     vpet.ParameterUpdateMSG.extend(struct.pack('B', 1))
-    vpet.socket_u.send(vpet.ParameterUpdateMSG)
+    sendUpdate(vpet.ParameterUpdateMSG)
 
 def SendUnlockMSG(sceneObject):
+    flushUpdates()
     vpet.ParameterUpdateMSG = bytearray([])
     vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.cID))
     vpet.ParameterUpdateMSG.extend(struct.pack('B', vpet.time))
@@ -292,18 +288,17 @@ def SendUnlockMSG(sceneObject):
     vpet.ParameterUpdateMSG.extend(struct.pack('B',vpet.cID))
     vpet.ParameterUpdateMSG.extend(struct.pack('H', sceneObject._id))
     vpet.ParameterUpdateMSG.extend(struct.pack('B', 0))
-    vpet.socket_u.send(vpet.ParameterUpdateMSG)
+    sendUpdate(vpet.ParameterUpdateMSG)
     
 def close_socket_d():
     global vpet, v_prop
     vpet = bpy.context.window_manager.vpet_data
     v_prop = bpy.context.scene.vpet_properties
-    if bpy.app.timers.is_registered(read_thread):
-        print("Stopping thread")
-        bpy.app.timers.unregister(read_thread)
+    if vpet.distributionServer:
+        print("Stopping distribution server")
+        vpet.distributionServer.stop()
+        vpet.distributionServer = None
         bpy.utils.unregister_class(TimerModalOperator)
-    if vpet.socket_d:
-        vpet.socket_d.close()
         
 def close_socket_s():
     global vpet, v_prop
@@ -312,8 +307,6 @@ def close_socket_s():
     if bpy.app.timers.is_registered(listener):
         print("Stopping subscription")
         bpy.app.timers.unregister(listener)
-    if vpet.socket_s:
-        vpet.socket_s.close()
 
 def close_socket_c():
     global vpet, v_prop
@@ -329,8 +322,11 @@ def close_socket_u():
     global vpet, v_prop
     vpet = bpy.context.window_manager.vpet_data
     v_prop = bpy.context.scene.vpet_properties
-    if vpet.socket_u:
-        vpet.socket_u.close()
+    if vpet.network:
+        print("Stopping update network")
+        vpet.network.stop()
+        vpet.network = None
+    vpet.updateBatcher = None
 
 
 def delta_time(startTime, endTime, length):
@@ -44,6 +44,34 @@ class VpetProperties(bpy.types.PropertyGroup):
     Command_Module_port: bpy.props.StringProperty(default = '5558')
     mixamo_humanoid: bpy.props.BoolProperty(name="Mixamo Unity Humanoid?",description="Check if using mixamo humanoid and you need to send the character to Unity",default=False)
     vpet_collection: bpy.props.StringProperty(name = 'VPET Collection', default = 'VPET_Collection', maxlen=30)
+    use_geo_cache: bpy.props.BoolProperty(name='Geometry Cache', default=True, description='Reuse the processed geometry of meshes that did not change since a previous distribution')
+    geo_cache_dir: bpy.props.StringProperty(name='Geometry Cache Directory', default='', subtype='DIR_PATH', description='Directory of the on disk geometry cache. Empty uses the temporary directory')
+    compression_level: bpy.props.IntProperty(name='Compression Level', default=0, min=0, max=9, description='zlib level used to compress packages for clients that accept compressed transfers. 0 disables compression')
+    stream_chunk_size: bpy.props.IntProperty(name='Stream Chunk Size (KB)', default=512, min=16, description='Largest chunk sent to clients that stream packages in chunks')
+    update_message_size: bpy.props.IntProperty(name='Update Message Size', default=1400, min=64, max=65536, description='Largest batched update message in bytes, keep it below the network MTU')
+    listener_budget: bpy.props.FloatProperty(name='Listener Budget (ms)', default=4.0, min=0.1, description='Time spent per tick receiving and applying scene updates from clients')
+    evaluated_meshes: bpy.props.BoolProperty(name='Apply Modifiers', default=False, description='Distribute meshes with their modifiers applied. The custom object property VPET-Modifier-Level selects VIEWPORT or RENDER settings')
+    evaluated_vertex_budget: bpy.props.IntProperty(name='Vertex Budget', default=1000000, min=0, description='Meshes with more vertices after applying their modifiers are distributed without them. 0 disables the limit')
+    expand_instances: bpy.props.BoolProperty(name='Expand Instances', default=True, description='Distribute meshes instanced by collection instances and geometry nodes as GEO nodes sharing the instanced geometry')
+    lod_levels: bpy.props.IntProperty(name='LOD Levels', default=0, min=0, max=3, description='Number of decimated levels of detail generated per mesh, requested by clients as objects?lod=N')
+    lod_ratio: bpy.props.FloatProperty(name='LOD Ratio', default=0.5, min=0.05, max=0.95, description='Share of faces kept from one level of detail to the next')
+    optimize_vertex_cache: bpy.props.BoolProperty(name='Optimize Vertex Cache', default=False, description='Reorder triangles and vertices of the distributed meshes for the vertex cache of the clients GPU. Slows down building meshes that are not cached yet')
+    compact_indices: bpy.props.BoolProperty(name='16 Bit Indices', default=False, description='Also serve the geometry with 16 bit indices, splitting large meshes, to clients requesting it. Other clients keep getting 32 bit indices')
+    quantize_geometry: bpy.props.BoolProperty(name='Quantized Geometry', default=False, description='Also serve the geometry with quantized vertex attributes to clients requesting it')
+    client_textures: bpy.props.BoolProperty(name='Client Class Textures', default=False, description='Also serve the textures downscaled for tablet and desktop clients requesting textures?class=<name>')
+    texture_size_tablet: bpy.props.IntProperty(name='Tablet Texture Size', default=2048, min=16, description='Largest width or height of the textures served to tablet clients')
+    texture_size_desktop: bpy.props.IntProperty(name='Desktop Texture Size', default=4096, min=16, description='Largest width or height of the textures served to desktop clients')
+    texture_format: bpy.props.EnumProperty(name='Texture Format', items=[('AUTO', 'Auto', 'JPEG, PNG for images with alpha channel that are not JPEG files'), ('PNG', 'PNG', 'Lossless'), ('JPEG', 'JPEG', 'Smallest')], default='AUTO', description='Format of the textures served to tablet and desktop clients')
+    texture_quality: bpy.props.IntProperty(name='JPEG Quality', default=90, min=1, max=100, description='Quality of textures encoded as JPEG')
+    texture_cache_dir: bpy.props.StringProperty(name='Texture Cache Directory', default='', subtype='DIR_PATH', description='Directory of the on disk cache of prepared textures. Empty uses the temporary directory')
+    texture_cache_memory: bpy.props.IntProperty(name='Texture Cache Memory (MB)', default=256, min=0, description='Amount of prepared textures kept in memory')
+    texture_cache_disk: bpy.props.IntProperty(name='Texture Cache Disk (MB)', default=4096, min=0, description='Amount of prepared textures kept in the cache directory, the least recently used are deleted first. 0 for no limit')
+    snapshot_serving: bpy.props.BoolProperty(name='Serve From Snapshot', default=False, description='Write the packages into a snapshot file and serve them from its memory map, so Blender does not keep copies of them')
+    snapshot_dir: bpy.props.StringProperty(name='Snapshot Directory', default='', subtype='DIR_PATH', description='Directory of the snapshot files. Empty uses the temporary directory')
+    export_gltf: bpy.props.BoolProperty(name='Export glTF', default=False, description='Also serve the scene as binary glTF (.glb) in the package gltf')
+    geo_workers: bpy.props.IntProperty(name='Geometry Workers', default=0, min=0, description='Number of processes building mesh geometry in parallel. 0 uses one per CPU core, 1 disables the pool')
+    geo_cache_memory: bpy.props.IntProperty(name='Geometry Cache Memory (MB)', default=512, min=0, description='Amount of processed geometry kept in memory')
+    geo_cache_disk: bpy.props.IntProperty(name='Geometry Cache Disk (MB)', default=4096, min=0, description='Amount of processed geometry kept in the cache directory, the least recently used is deleted first. 0 for no limit')
     #edit_collection: bpy.props.StringProperty(name = 'Editable Collection', default = 'VPET_editable', maxlen=30)
 
 ## Class to keep data
@@ -74,14 +102,14 @@ class VpetData():
     editable_objects = []
 
     SceneObjects = []
+    registry = None
 
     rootChildCount = 0
     
-    socket_d = None
-    socket_s = None
+    distributionServer = None
+    network = None
+    updateBatcher = None
     socket_c = None
-    socket_u = None
-    poller = None
     ctx = None
     cID = None
     time = 0
@@ -94,9 +122,17 @@ class VpetData():
     materialsByteData = bytearray([])
     charactersByteData = bytearray([])
     curvesByteData = bytearray([])
+    gltfByteData = bytearray([])
     pingByteMSG = bytearray([])
     ParameterUpdateMSG = bytearray([])
 
+    encodedPackages = {}
+    variantPackages = {}
+    texturePackages = {}
+    snapshot = None
+    packageStats = {}
+    listenerStats = {}
+
     nodeTypes = ['GROUP', 'GEO', 'LIGHT', 'CAMERA', 'SKINNEDMESH', 'CHARACTER']
     lightTypes = ['SPOT', 'SUN', 'POINT', 'AREA']
 
@@ -69,18 +69,18 @@ class OBJECT_OT_single_select(bpy.types.Operator):
                 # Check for deselection
                 deselected_objects = self.last_selected_objects - current_selected_objects
                 for obj in deselected_objects:
-                    for scene_obj in vpet.SceneObjects:
-                        if obj == scene_obj.editableObject:
-                            SendUnlockMSG(scene_obj)
-                            print(f"Deselected object: {obj.name}")
+                    scene_obj = vpet.registry.sceneObjectFor(obj)
+                    if scene_obj is not None:
+                        SendUnlockMSG(scene_obj)
+                        print(f"Deselected object: {obj.name}")
 
                 # Check for new selection
                 newly_selected_objects = current_selected_objects - self.last_selected_objects
                 for obj in newly_selected_objects:
-                    for scene_obj in vpet.SceneObjects:
-                        if obj == scene_obj.editableObject:
-                            SendLockMSG(scene_obj)
-                            print(f"Selected object: {obj.name}")
+                    scene_obj = vpet.registry.sceneObjectFor(obj)
+                    if scene_obj is not None:
+                        SendLockMSG(scene_obj)
+                        print(f"Selected object: {obj.name}")
 
                 # Update the last selected objects set
                 self.last_selected_objects = current_selected_objects
@@ -0,0 +1,202 @@
+"""
+TRACER Scene Distribution Plugin Blender
+ 
+Copyright (c) 2024 Filmakademie Baden-Wuerttemberg, Animationsinstitut R&D Labs
+https://research.animationsinstitut.de/tracer
+https://github.com/FilmakademieRnd/TracerSceneDistribution
+ 
+TRACER Scene Distribution Plugin Blender is a development by Filmakademie
+Baden-Wuerttemberg, Animationsinstitut R&D Labs in the scope of the EU funded
+project MAX-R (101070072) and funding on the own behalf of Filmakademie
+Baden-Wuerttemberg.  Former EU projects Dreamspace (610005) and SAUCE (780470)
+have inspired the TRACER Scene Distribution Plugin Blender development.
+ 
+The TRACER Scene Distribution Plugin Blender is intended for research and
+development purposes only. Commercial use of any kind is not permitted.
+ 
+There is no support by Filmakademie. Since the TRACER Scene Distribution Plugin
+Blender is available for free, Filmakademie shall only be liable for intent
+and gross negligence; warranty is limited to malice. TRACER Scene Distribution
+Plugin Blender may under no circumstances be used for racist, sexual or any
+illegal purposes. In all non-commercial productions, scientific publications,
+prototypical non-commercial software tools, etc. using the TRACER Scene
+Distribution Plugin Blender Filmakademie has to be named as follows: 
+"TRACER Scene Distribution Plugin Blender by Filmakademie
+Baden-Württemberg, Animationsinstitut (http://research.animationsinstitut.de)".
+ 
+In case a company or individual would like to use the TRACER Scene Distribution
+Plugin Blender in a commercial surrounding or for commercial purposes,
+software based on these components or  any part thereof, the company/individual
+will have to contact Filmakademie (research<at>filmakademie.de) for an
+individual license agreement.
+ 
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+## Texture pipeline for the client classes
+#
+#  Textures are prepared once per client class with its own largest resolution. Larger images
+#  are downscaled on a copy with Image.scale, so the image of the artist is never touched, and
+#  re-encoded to PNG or JPEG. Images that are small enough and already 8 bit PNG or JPEG files
+#  are passed through as they are, their entries are not copied.
+#  The transcoded texture entries are kept in an on disk cache keyed by the hash of the source
+#  file and the settings, so a repeated distribution only reads the source files.
+
+import os
+import tempfile
+
+import bpy
+
+from .Distribution.geoCache import GeoCache, derivedKey
+from .Distribution.packageSerializer import serializeTextures
+
+## Client classes with their own texture variant, served as 'textures?class=<name>'
+clientClasses = ('tablet', 'desktop')
+
+## Increase whenever the transcoding changes
+PIPELINE_VERSION = 2
+
+textureCache = None
+
+## Directory of the texture cache if none is set
+def defaultDirectory():
+    return os.path.join(tempfile.gettempdir(), 'vpet_texture_cache')
+
+## Get the cache of prepared textures
+#
+# @param directory Directory for the on disk cache
+# @param maxMemory Maximum number of bytes kept in memory
+# @param maxDisk   Maximum number of bytes kept in the directory, 0 for no limit
+def getTextureCache(directory, maxMemory, maxDisk=0):
+    global textureCache
+    if textureCache == None or textureCache.directory != directory:
+        textureCache = GeoCache(maxMemory, directory, suffix='.tex', maxDisk=maxDisk)
+    textureCache.maxMemory = maxMemory
+    textureCache.maxDisk = maxDisk
+    return textureCache
+
+## Whether an image uses its alpha channel
+#
+# Blender loads nearly every image with four channels, so the bits per pixel and the
+# source format decide. JPEG files never carry alpha.
+def hasAlpha(image):
+    if image.file_format == 'JPEG' or image.alpha_mode == 'NONE':
+        return False
+    return image.depth in (32, 64, 128)
+
+## File format a texture is encoded in
+#
+# @param fileFormat 'AUTO', 'PNG' or 'JPEG', AUTO keeps JPEG sources as JPEG, images with alpha
+#                   as PNG and encodes everything else as JPEG
+def targetFormat(image, fileFormat):
+    if fileFormat != 'AUTO':
+        return fileFormat
+    return 'PNG' if hasAlpha(image) else 'JPEG'
+
+## Whether an image can be sent as it is
+#
+# @param image      The image datablock
+# @param maxSize    Largest width or height
+# @param fileFormat 'AUTO', 'PNG' or 'JPEG'
+def isPassThrough(image, maxSize, fileFormat):
+    fileFormat = targetFormat(image, fileFormat)
+    return max(image.size) <= maxSize and image.file_format in ('PNG', 'JPEG') and not image.is_float and \
+        (image.file_format == fileFormat or fileFormat == 'PNG')
+
+## Downscale and re-encode an image
+#
+# @param image      The image datablock
+# @param data       Content of the image file
+# @param maxSize    Largest width or height
+# @param fileFormat 'AUTO', 'PNG' or 'JPEG'
+# @param quality    JPEG quality
+# @returns          Tuple (encoded image file, width, height)
+def transcodeImage(image, data, maxSize, fileFormat, quality):
+    width, height = image.size
+    if isPassThrough(image, maxSize, fileFormat):
+        return data, width, height
+    scale = min(1.0, maxSize / max(width, height, 1))
+    fileFormat = targetFormat(image, fileFormat)
+
+    copy = image.copy()
+    handle, path = tempfile.mkstemp(suffix='.png' if fileFormat == 'PNG' else '.jpg')
+    os.close(handle)
+    try:
+        if scale < 1.0:
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+            copy.scale(width, height)
+        copy.filepath_raw = path
+        copy.file_format = fileFormat
+        try:
+            copy.save(filepath=path, quality=quality)
+        except TypeError:
+            # Blender before 3.4 has no arguments, JPEG uses its default quality
+            copy.save()
+        with open(path, 'rb') as file:
+            return file.read(), width, height
+    finally:
+        bpy.data.images.remove(copy)
+        os.remove(path)
+
+## Prepare the texture package entries of a client class
+#
+# @param textureList List of gathered textures, providing image, colorMapData and sourceHash
+# @param maxSize     Largest width or height of the client class
+# @param fileFormat  'AUTO', 'PNG' or 'JPEG'
+# @param quality     JPEG quality
+# @param cache       Cache of prepared texture entries
+# @returns           Tuple (list of serialized texture entries, None where the texture is sent unchanged,
+#                    number of entries taken from the cache)
+def classTextureEntries(textureList, maxSize, fileFormat, quality, cache):
+    entries = []
+    hits = 0
+    for tex in textureList:
+        if isPassThrough(tex.image, maxSize, fileFormat):
+            entries.append(None)
+            continue
+        key = derivedKey(tex.sourceHash, PIPELINE_VERSION, maxSize, fileFormat, quality)
+        entry = cache.get(key)
+        if entry == None:
+            try:
+                data, width, height = transcodeImage(tex.image, tex.colorMapData, maxSize, fileFormat, quality)
+            except RuntimeError as e:
+                print(f"Could not prepare texture {tex.texture}, sending it unchanged: {e}")
+                entries.append(None)
+                continue
+            prepared = type(tex)()
+            prepared.width, prepared.height, prepared.format = width, height, tex.format
+            prepared.colorMapData, prepared.colorMapDataSize = data, len(data)
+            entry = bytes(serializeTextures([prepared]))
+            cache.put(key, entry)
+        else:
+            hits += 1
+        entries.append(entry)
+    return entries, hits
+
+## Image files of the textures for the glTF export
+#
+# glTF embeds PNG and JPEG files only, these are taken unchanged. Other sources such as EXR or
+# 16 bit images are re-encoded to PNG at their full size.
+#
+# @param textureList List of gathered textures, providing image, colorMapData and sourceHash
+# @param cache       Cache of re-encoded image files
+# @returns           List with the image file of every texture
+def gltfImages(textureList, cache):
+    images = []
+    for tex in textureList:
+        maxSize = max(tex.image.size)
+        if isPassThrough(tex.image, maxSize, 'PNG'):
+            images.append(tex.colorMapData)
+            continue
+        key = derivedKey(tex.sourceHash, PIPELINE_VERSION, 'gltf')
+        data = cache.get(key)
+        if data == None:
+            try:
+                data = transcodeImage(tex.image, tex.colorMapData, maxSize, 'PNG', 100)[0]
+            except RuntimeError as e:
+                print(f"Could not convert texture {tex.texture} for glTF, leaving it out: {e}")
+                data = tex.colorMapData
+            else:
+                cache.put(key, data)
+        images.append(data)
+    return images
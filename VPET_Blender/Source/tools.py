@@ -126,6 +126,12 @@ def cleanUp(level):
         vpet.geoByteData = bytearray([]) # geo data as bytes
         vpet.texturesByteData = bytearray([]) # texture data as bytes
         vpet.materialsByteData = bytearray([]) # materials data as bytes
+        vpet.gltfByteData = bytearray([]) # scene as binary glTF
+        vpet.encodedPackages = {} # compressed variants of the packages
+        vpet.variantPackages = {} # variants of the packages, e.g. levels of detail
+        vpet.texturePackages = {} # single textures by content hash and the list of hashes
+        vpet.snapshot = None # memory mapped snapshot file the packages are served from
+        vpet.packageStats = {} # encoding statistics of the packages
         vpet.pingByteMSG = bytearray([]) # ping msg as bytes
         ParameterUpdateMSG = bytearray([])# Parameter update msg as bytes
 
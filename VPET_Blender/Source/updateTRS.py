@@ -34,122 +34,168 @@ individual license agreement.
 """
 
 import bpy
-import time
-
+from bpy.app.handlers import persistent
+from .serverAdapter import flushUpdates
+
+## Objects watched for changes, object name -> TrackedObject
+tracked = {}
+## Light and camera data name -> names of the tracked objects using it
+trackedData = {}
+## Number of objects in the file, a change means objects were added or deleted
+objectCount = 0
+
+## Last sent values of an editable object
+class TrackedObject:
+    def __init__(self, obj, sceneObject):
+        self.sceneObject = sceneObject
+        self.location = obj.location.copy()
+        self.rotation = obj.rotation_euler.copy()
+        self.scale = obj.scale.copy()
+        if obj.type == 'LIGHT':
+            self.data = [obj.data.color.copy(), obj.data.energy]
+        elif obj.type == 'CAMERA':
+            self.data = [obj.data.angle, obj.data.clip_start, obj.data.clip_end]
+        else:
+            self.data = []
+
+## Starts sending the changes of editable objects to the clients
+#
+#  Changes are detected by a depsgraph_update_post handler, so only objects whose transform or
+#  light or camera data changed are checked, and their updates go out in the same frame.
 class RealTimeUpdaterOperator(bpy.types.Operator):
     bl_idname = "wm.real_time_updater"
     bl_label = "Real-Time Updater"
 
-    _timer = None
-
-    
-    def modal(self, context, event):
-        if event.type == 'TIMER':
-            self.check_for_updates(context)
-        return {'PASS_THROUGH'}
-
     def execute(self, context):
-        wm = context.window_manager
-        collection = bpy.data.collections.get("VPET_Collection")
-        self.start_transforms = {}
         global vpet
         vpet = bpy.context.window_manager.vpet_data
+        tracked.clear()
+        trackedData.clear()
+        collection = bpy.data.collections.get("VPET_Collection")
         for obj in collection.objects:
-            # Common properties for all objects
-            transform_data = (obj.location.copy(), obj.rotation_euler.copy(), obj.scale.copy())
-
-            # Additional properties for lights
-            if obj.type == 'LIGHT':
-                light_data = (obj.data.color.copy(), obj.data.energy)
-                self.start_transforms[obj.name] = transform_data + light_data
-
-            # Additional properties for cameras
-            elif obj.type == 'CAMERA':
-                camera_data = (obj.data.angle, obj.data.clip_start, obj.data.clip_end)
-                self.start_transforms[obj.name] = transform_data + camera_data
-
-            # For other types of objects
-            else:
-                self.start_transforms[obj.name] = transform_data
-
-        self._timer = wm.event_timer_add(0.1, window=context.window)
-        wm.modal_handler_add(self)
-        return {'RUNNING_MODAL'}
-    
-
-    def color_difference(color1, color2):
-        """Calculate the Euclidean distance between two color vectors."""
-        return sum((c1 - c2) ** 2 for c1, c2 in zip(color1, color2)) ** 0.5
-
-    def check_for_updates(self, context):
-        print("Update!")
-        for obj in bpy.data.collections.get("VPET_Collection").objects:
-            if obj.name not in self.start_transforms:
+            scene_obj = vpet.registry.sceneObjectFor(obj)
+            if scene_obj is None:
                 continue
-
-            stored_values = self.start_transforms[obj.name]
-            start_location, start_rotation, start_scale = stored_values[:3]
-
-                # Compare the current transform with the starting one
-            if (obj.location - start_location).length > 0.0001:
-                for scene_obj in vpet.SceneObjects:
-                    if obj == scene_obj.editableObject:
-                        scene_obj._parameterList[0].set_value(obj.location)
-
-            rotation_difference = (start_rotation.to_matrix().inverted() @ obj.rotation_euler.to_matrix()).to_euler()
-            if any(abs(value) > 0.0001 for value in rotation_difference):
-                for scene_obj in vpet.SceneObjects:
-                    if obj == scene_obj.editableObject:
-                        scene_obj._parameterList[1].set_value(obj.rotation_quaternion)
-
-            if (obj.scale - start_scale).length > 0.0001:
-                for scene_obj in vpet.SceneObjects:
-                    if obj == scene_obj.editableObject:
-                        scene_obj._parameterList[2].set_value(obj.scale)
-
-            if obj.type == 'LIGHT':
-                start_color, start_energy = self.start_transforms[obj.name][3:5]
-
-                if RealTimeUpdaterOperator.color_difference(obj.data.color, start_color) > 0.0001:
-                    for scene_obj in vpet.SceneObjects:
-                        if obj == scene_obj.editableObject:
-                            scene_obj._parameterList[3].set_value(obj.data.color)
-
-                if abs(obj.data.energy - start_energy) > 0.0001:
-                    for scene_obj in vpet.SceneObjects:
-                        if obj == scene_obj.editableObject:
-                            scene_obj._parameterList[4].set_value(obj.data.energy)
-
-        # Additional checks for cameras
-            elif obj.type == 'CAMERA':
-                start_angle, start_clip_start, start_clip_end = stored_values[3:6]
-
-                if abs(obj.data.angle - start_angle) > 0.0001:
-                    for scene_obj in vpet.SceneObjects:
-                        if obj == scene_obj.editableObject:
-                            scene_obj._parameterList[3].set_value(obj.data.angle)
-
-                if abs(obj.data.clip_start - start_clip_start) > 0.0001:
-                    for scene_obj in vpet.SceneObjects:
-                        if obj == scene_obj.editableObject:
-                            scene_obj._parameterList[4].set_value(obj.data.clip_start)
-
-                if abs(obj.data.clip_end - start_clip_end) > 0.0001:
-                    for scene_obj in vpet.SceneObjects:
-                        if obj == scene_obj.editableObject:
-                            scene_obj._parameterList[5].set_value(obj.data.clip_end)
-
-
-                # Update the starting transform and specific properties for lights and cameras
-            if obj.type == 'LIGHT':
-                self.start_transforms[obj.name] = (obj.location.copy(), obj.rotation_euler.copy(), obj.scale.copy(), obj.data.color.copy(), obj.data.energy)
-            elif obj.type == 'CAMERA':
-                self.start_transforms[obj.name] = (obj.location.copy(), obj.rotation_euler.copy(), obj.scale.copy(), obj.data.angle, obj.data.clip_start, obj.data.clip_end)
-            else:
-                self.start_transforms[obj.name] = (obj.location.copy(), obj.rotation_euler.copy(), obj.scale.copy())
-
-    def cancel(self, context):
-        wm = context.window_manager
-        wm.event_timer_remove(self._timer)
-
-    
+            tracked[obj.name] = TrackedObject(obj, scene_obj)
+            if obj.type in ('LIGHT', 'CAMERA'):
+                trackedData.setdefault(obj.data.name, []).append(obj.name)
+
+        global objectCount
+        objectCount = len(bpy.data.objects)
+        if on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+            bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+        for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+            if on_objects_replaced not in handlers:
+                handlers.append(on_objects_replaced)
+        return {'FINISHED'}
+
+## Stop watching the editable objects
+def stop_real_time_updater():
+    if on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        if on_objects_replaced in handlers:
+            handlers.remove(on_objects_replaced)
+    tracked.clear()
+    trackedData.clear()
+
+## Drop the SceneObjects of deleted objects from the registry and stop tracking them
+#
+#  A new object may reuse the memory of a deleted one, its pointer would otherwise resolve to
+#  the SceneObject of the deleted object.
+def prune_registry():
+    global objectCount
+    objectCount = len(bpy.data.objects)
+    if vpet.registry is None or not vpet.registry.prune():
+        return
+    for name in [name for name, entry in tracked.items() if entry.sceneObject not in vpet.registry.sceneObjects]:
+        del tracked[name]
+
+## Prune the registry after undo, redo and loading a file, which replace the objects
+@persistent
+def on_objects_replaced(*args):
+    prune_registry()
+
+def color_difference(color1, color2):
+    """Calculate the Euclidean distance between two color vectors."""
+    return sum((c1 - c2) ** 2 for c1, c2 in zip(color1, color2)) ** 0.5
+
+## Send the changes reported by the depsgraph
+def on_depsgraph_update(scene, depsgraph):
+    # keep the registry in sync when objects are added or deleted, a delete and an add
+    # between two updates leave the number of objects unchanged
+    if depsgraph.id_type_updated('OBJECT') or len(bpy.data.objects) != objectCount:
+        prune_registry()
+
+    changedTransforms = set()
+    changedData = set()
+    for update in depsgraph.updates:
+        id = update.id.original
+        if isinstance(id, bpy.types.Object):
+            if id.name not in tracked:
+                continue
+            if update.is_updated_transform:
+                changedTransforms.add(id.name)
+            if update.is_updated_geometry and id.type in ('LIGHT', 'CAMERA'):
+                changedData.add(id.name)
+        elif isinstance(id, (bpy.types.Light, bpy.types.Camera)):
+            changedData.update(trackedData.get(id.name, ()))
+
+    if not changedTransforms and not changedData:
+        return
+
+    objects = bpy.data.objects
+    for name in changedTransforms:
+        obj = objects.get(name)
+        if obj is not None:
+            check_transform(obj, tracked[name])
+    for name in changedData:
+        obj = objects.get(name)
+        if obj is not None and name in tracked:
+            check_data(obj, tracked[name])
+
+    # send everything that changed in this update as batched messages
+    flushUpdates()
+
+def check_transform(obj, entry):
+    parameters = entry.sceneObject._parameterList
+
+    if (obj.location - entry.location).length > 0.0001:
+        entry.location = obj.location.copy()
+        parameters[0].set_value(obj.location)
+
+    rotation_difference = (entry.rotation.to_matrix().inverted() @ obj.rotation_euler.to_matrix()).to_euler()
+    if any(abs(value) > 0.0001 for value in rotation_difference):
+        entry.rotation = obj.rotation_euler.copy()
+        parameters[1].set_value(obj.rotation_quaternion)
+
+    if (obj.scale - entry.scale).length > 0.0001:
+        entry.scale = obj.scale.copy()
+        parameters[2].set_value(obj.scale)
+
+def check_data(obj, entry):
+    parameters = entry.sceneObject._parameterList
+
+    if obj.type == 'LIGHT':
+        color, energy = entry.data
+        if color_difference(obj.data.color, color) > 0.0001:
+            entry.data[0] = obj.data.color.copy()
+            parameters[3].set_value(obj.data.color)
+
+        if abs(obj.data.energy - energy) > 0.0001:
+            entry.data[1] = obj.data.energy
+            parameters[4].set_value(obj.data.energy)
+
+    elif obj.type == 'CAMERA':
+        angle, clip_start, clip_end = entry.data
+        if abs(obj.data.angle - angle) > 0.0001:
+            entry.data[0] = obj.data.angle
+            parameters[3].set_value(obj.data.angle)
+
+        if abs(obj.data.clip_start - clip_start) > 0.0001:
+            entry.data[1] = obj.data.clip_start
+            parameters[4].set_value(obj.data.clip_start)
+
+        if abs(obj.data.clip_end - clip_end) > 0.0001:
+            entry.data[2] = obj.data.clip_end
+            parameters[5].set_value(obj.data.clip_end)
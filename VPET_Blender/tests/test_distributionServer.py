@@ -0,0 +1,86 @@
+## Tests of the distribution server and the chunked client download
+#
+#  Only the bpy-free Distribution package is imported, run from VPET_Blender with
+#  python -m pytest tests
+
+import os
+import sys
+import threading
+
+import zmq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Source'))
+
+from Distribution.distributionServer import DistributionServer, requestChunked
+
+## Socket answering chunk requests in reverse order of arrival
+class ReorderingSocket:
+    def __init__(self, server, credit):
+        self.server = server
+        self.credit = credit
+        self.requests = []
+        self.replies = []
+
+    def send_string(self, request):
+        self.requests.append(request)
+
+    def recv_multipart(self, copy=True):
+        if not self.replies:
+            batch, self.requests = self.requests[:self.credit], self.requests[self.credit:]
+            self.replies = [self.server.reply(request) for request in reversed(batch)]
+        return self.replies.pop(0)
+
+def test_request_chunked_reassembles_by_offset():
+    data = os.urandom(300 * 1024 + 7)
+    server = DistributionServer(None, None, {'objects': data}, maxChunkSize=16 * 1024)
+    socket = ReorderingSocket(server, credit=8)
+    assert b''.join(bytes(chunk) for chunk in requestChunked(socket, 'objects', chunkSize=16 * 1024, credit=8)) == data
+
+def test_pipelined_downloads_with_workers():
+    data = os.urandom(1280 * 1024)
+    context = zmq.Context()
+    address = f'inproc://test-distribution-{id(data)}'
+    server = DistributionServer(context, address, {'objects': data}, maxChunkSize=32 * 1024, workers=4)
+    server.start()
+    results = []
+
+    def download():
+        socket = context.socket(zmq.DEALER)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.connect(address)
+        results.append(b''.join(bytes(chunk) for chunk in requestChunked(socket, 'objects', chunkSize=32 * 1024)))
+        socket.close()
+
+    try:
+        clients = [threading.Thread(target=download) for _ in range(20)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join(30)
+    finally:
+        server.stop()
+        context.term()
+    assert len(results) == 20
+    assert all(result == data for result in results)
+
+def test_replies_beyond_send_queue_are_not_dropped():
+    context = zmq.Context()
+    address = f'inproc://test-distribution-queue-{id(context)}'
+    server = DistributionServer(context, address, {'header': b'header' * 1000}, sendQueueSize=4)
+    server.start()
+    socket = context.socket(zmq.DEALER)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.setsockopt(zmq.RCVHWM, 4)
+    socket.connect(address)
+    try:
+        for _ in range(200):
+            socket.send_string('header')
+        replies = 0
+        while socket.poll(1000):
+            socket.recv_multipart()
+            replies += 1
+    finally:
+        socket.close()
+        server.stop()
+        context.term()
+    assert replies == 200